@@ -1090,12 +1090,10 @@ async def get_logs(limit: int = 100, token: str = Depends(verify_admin_token)):
             "task_id": log.get("task_id")
         }
 
-        # If task_id exists, get task progress and status
-        if log.get("task_id"):
-            task = await db.get_task(log.get("task_id"))
-            if task:
-                log_data["progress"] = task.progress
-                log_data["task_status"] = task.status
+        # Task progress and status are joined in by get_recent_logs
+        if log.get("task_id") and log.get("task_status") is not None:
+            log_data["progress"] = log.get("task_progress")
+            log_data["task_status"] = log.get("task_status")
 
         result.append(log_data)
 
@@ -1,13 +1,163 @@
 """Database storage layer - PostgreSQL version"""
 import asyncpg
 import asyncio
+import functools
 import json
 import os
-from datetime import datetime
-from typing import Optional, List
-from urllib.parse import urlparse
+import time
+import uuid
+from datetime import date, datetime
+from typing import Any, Optional, List, Dict, Set, Tuple
 from .models import Token, TokenStats, Task, RequestLog, AdminConfig, ProxyConfig, WatermarkFreeConfig, CacheConfig, GenerationConfig, TokenRefreshConfig
 
+# Schema version recorded after a successful migration pass.
+# Bump this whenever check_and_migrate_db gains a new migration.
+EXPECTED_SCHEMA_VERSION = "2026-10-15.3"
+
+# Columns backing the Token model (tokens.username is not part of the model).
+# Several are added by check_and_migrate_db, so nothing that runs before it
+# (pool init, init_db) may select this list.
+_TOKEN_COLUMNS = """id, token, email, name, st, rt, client_id, proxy_url, remark, expiry_time,
+    is_active, cooled_until, created_at, last_used_at, use_count, plan_type, plan_title,
+    subscription_end, sora2_supported, sora2_invite_code, sora2_redeemed_count,
+    sora2_total_count, sora2_remaining_count, sora2_cooldown_until, image_enabled,
+    video_enabled, image_concurrency, video_concurrency, is_expired"""
+# Columns backing the TokenStats and Task models
+_TOKEN_STATS_COLUMNS = """id, token_id, image_count, video_count, error_count, last_error_at,
+    today_image_count, today_video_count, today_error_count, today_date,
+    consecutive_error_count"""
+_TASK_COLUMNS = """id, task_id, token_id, model, prompt, status, progress, result_urls,
+    error_message, retry_count, created_at, completed_at"""
+
+# Hot single-row token lookups
+_SQL_GET_TOKEN = f"SELECT {_TOKEN_COLUMNS} FROM tokens WHERE id = $1"
+_SQL_GET_TOKEN_BY_VALUE = f"SELECT {_TOKEN_COLUMNS} FROM tokens WHERE token = $1"
+_SQL_GET_TOKEN_BY_EMAIL = f"SELECT {_TOKEN_COLUMNS} FROM tokens WHERE email = $1"
+
+# One-row tables keyed by id = 1, guarded by a <table>_singleton CHECK constraint
+_SINGLETON_TABLES = ("admin_config", "proxy_config", "watermark_free_config", "cache_config",
+                     "generation_config", "token_refresh_config", "call_logic_config",
+                     "pow_proxy_config", "schema_version")
+
+# Other hot reads; asyncpg's per-connection statement cache keeps them prepared
+_SQL_GET_ACTIVE_TOKENS = f"""
+    SELECT {_TOKEN_COLUMNS} FROM tokens
+    WHERE is_active = TRUE
+    AND (cooled_until IS NULL OR cooled_until < CURRENT_TIMESTAMP)
+    AND expiry_time > CURRENT_TIMESTAMP
+    ORDER BY last_used_at ASC NULLS FIRST
+"""
+_SQL_GET_ALL_TOKENS = f"SELECT {_TOKEN_COLUMNS} FROM tokens ORDER BY created_at DESC"
+_SQL_GET_TOKEN_STATS = f"SELECT {_TOKEN_STATS_COLUMNS} FROM token_stats WHERE token_id = $1"
+_SQL_GET_TASK = f"SELECT {_TASK_COLUMNS} FROM tasks WHERE task_id = $1"
+_SQL_GET_RECENT_LOGS = """
+    SELECT
+        rl.id,
+        rl.token_id,
+        rl.task_id,
+        rl.operation,
+        rl.request_body,
+        rl.response_body,
+        rl.status_code,
+        rl.duration,
+        rl.created_at,
+        t.email as token_email,
+        t.username as token_username,
+        tk.progress as task_progress,
+        tk.status as task_status
+    FROM request_logs rl
+    LEFT JOIN tokens t ON rl.token_id = t.id
+    LEFT JOIN tasks tk ON rl.task_id = tk.task_id
+    ORDER BY rl.created_at DESC
+    LIMIT $1
+"""
+_SQL_GET_ADMIN_CONFIG = """
+    SELECT id, admin_username, admin_password, api_key, error_ban_threshold,
+        task_retry_enabled, task_max_retries, auto_disable_on_401, updated_at
+    FROM admin_config WHERE id = 1 LIMIT 1
+"""
+_SQL_GET_PROXY_CONFIG = """
+    SELECT id, proxy_enabled, proxy_url, created_at, updated_at
+    FROM proxy_config WHERE id = 1 LIMIT 1
+"""
+_SQL_GET_WATERMARK_FREE_CONFIG = """
+    SELECT id, watermark_free_enabled, parse_method, custom_parse_url, custom_parse_token,
+        fallback_on_failure, created_at, updated_at
+    FROM watermark_free_config WHERE id = 1 LIMIT 1
+"""
+_SQL_GET_CACHE_CONFIG = """
+    SELECT id, cache_enabled, cache_timeout, cache_base_url, created_at, updated_at
+    FROM cache_config WHERE id = 1 LIMIT 1
+"""
+_SQL_GET_GENERATION_CONFIG = """
+    SELECT id, image_timeout, video_timeout, created_at, updated_at
+    FROM generation_config WHERE id = 1 LIMIT 1
+"""
+_SQL_GET_TOKEN_REFRESH_CONFIG = """
+    SELECT id, at_auto_refresh_enabled, created_at, updated_at
+    FROM token_refresh_config WHERE id = 1 LIMIT 1
+"""
+_SQL_GET_CALL_LOGIC_CONFIG = """
+    SELECT id, call_mode, polling_mode_enabled, created_at, updated_at
+    FROM call_logic_config WHERE id = 1 LIMIT 1
+"""
+_SQL_GET_POW_PROXY_CONFIG = """
+    SELECT id, pow_proxy_enabled, pow_proxy_url, created_at, updated_at
+    FROM pow_proxy_config WHERE id = 1 LIMIT 1
+"""
+_SQL_UPSERT_POW_PROXY_CONFIG = """
+    INSERT INTO pow_proxy_config (id, pow_proxy_enabled, pow_proxy_url, updated_at)
+    VALUES (1, $1, $2, CURRENT_TIMESTAMP)
+    ON CONFLICT (id) DO UPDATE SET
+        pow_proxy_enabled = EXCLUDED.pow_proxy_enabled,
+        pow_proxy_url = EXCLUDED.pow_proxy_url,
+        updated_at = CURRENT_TIMESTAMP
+    WHERE pow_proxy_config.pow_proxy_enabled IS DISTINCT FROM EXCLUDED.pow_proxy_enabled
+       OR pow_proxy_config.pow_proxy_url IS DISTINCT FROM EXCLUDED.pow_proxy_url
+    RETURNING id, pow_proxy_enabled, pow_proxy_url, created_at, updated_at
+"""
+
+# In-process cache for get_token_by_value
+_TOKEN_CACHE_TTL = 30  # seconds
+_TOKEN_CACHE_MAXSIZE = 1024
+
+# Buffered request log writer (see log_request_buffered)
+_REQUEST_LOG_COLUMNS = ["token_id", "task_id", "operation", "request_body",
+                        "response_body", "status_code", "duration"]
+_LOG_QUEUE_MAXSIZE = 10000
+_LOG_BATCH_SIZE = 500
+_LOG_FLUSH_INTERVAL = 0.05  # seconds
+
+# Write-behind coalescing for update_token_usage
+_USAGE_FLUSH_INTERVAL = 2  # seconds
+
+# In-process cache for the singleton config rows, invalidated by the update_*_config methods
+_CONFIG_CACHE_TTL = 5  # seconds
+# NOTIFY channel used to drop config cache entries in other processes
+_CONFIG_CHANNEL = "config_changed"
+
+
+@functools.lru_cache(maxsize=256)
+def _build_update_sql(table: str, columns: Tuple[str, ...], extra: str = "") -> str:
+    """Build "UPDATE table SET col = $1, ... WHERE id = $n" for the given columns
+
+    Memoized per (table, columns) so repeated partial updates reuse the same SQL text.
+    """
+    assignments = [f"{col} = ${idx}" for idx, col in enumerate(columns, 1)]
+    if extra:
+        assignments.append(extra)
+    return f"UPDATE {table} SET {', '.join(assignments)} WHERE id = ${len(columns) + 1}"
+
+
+def _cached_config(key: str):
+    """Serve a get_*_config method from the in-process config cache under key"""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(self):
+            return await self._get_cached_config(key, lambda: func(self))
+        return wrapper
+    return decorator
+
 
 class Database:
     """PostgreSQL database manager"""
@@ -17,52 +167,126 @@ class Database:
             db_url = os.environ.get("DATABASE_URL")
         self.db_url = db_url
         self._pool: Optional[asyncpg.Pool] = None
+        self._pool_lock = asyncio.Lock()  # Serialize first-time pool creation
+        # token value -> (cached_at, Token), plus token id -> token value for invalidation
+        self._token_cache: Dict[str, Tuple[float, Token]] = {}
+        self._token_cache_keys: Dict[int, str] = {}
+        # config key -> (cached_at, config model), with one lock per key against stampedes
+        self._config_cache: Dict[str, Tuple[float, Any]] = {}
+        self._config_locks: Dict[str, asyncio.Lock] = {}
+        self._instance_id = uuid.uuid4().hex  # Lets the listener ignore our own notifications
+        self._config_listener: Optional[asyncpg.Connection] = None
+        self._log_queue: asyncio.Queue = asyncio.Queue(maxsize=_LOG_QUEUE_MAXSIZE)
+        self._log_writer_task: Optional[asyncio.Task] = None
+        # token id -> uses not yet written
+        self._pending_usage: Dict[int, int] = {}
+        self._usage_writer_task: Optional[asyncio.Task] = None
+        self._usage_writer_stop = asyncio.Event()
+        # DB_PGBOUNCER=1: DATABASE_URL points at PgBouncer in transaction mode, so
+        # no server-side prepared statements and only a small per-process pool
+        self._pgbouncer = os.environ.get("DB_PGBOUNCER") == "1"
+        self._pool_min_size = int(os.environ.get("DB_POOL_MIN", "1" if self._pgbouncer else "5"))
+        self._pool_max_size = int(os.environ.get("DB_POOL_MAX", "5" if self._pgbouncer else "25"))
+        # Setting only one bound can cross the other's default; create_pool would
+        # reject min > max, and get_pool would retry that as a connection failure
+        self._pool_min_size = min(self._pool_min_size, self._pool_max_size)
+        # LISTEN needs a session of its own, which PgBouncer in transaction mode
+        # cannot provide; DATABASE_DIRECT_URL can name the server itself
+        self._listen_url = os.environ.get("DATABASE_DIRECT_URL") or (
+            None if self._pgbouncer else self.db_url)
+        # Seconds before an idle connection is closed; 0 keeps them open forever
+        self._pool_max_idle = float(os.environ.get("DB_POOL_MAX_IDLE", "0"))
 
         if self.db_url:
-            try:
-                parsed = urlparse(self.db_url)
-                print(
-                    f"Database configured: host={parsed.hostname}, port={parsed.port}, db={parsed.path[1:] if parsed.path else 'unknown'}"
-                )
-            except Exception as e:
-                print(f"Warning: Could not parse DATABASE_URL: {e}")
+            # Plain string slicing is enough to log host:port/db without credentials
+            location = self.db_url.split("://", 1)[-1].rsplit("@", 1)[-1]
+            host, _, db_name = location.partition("/")
+            print(
+                f"Database configured: host={host}, db={db_name.split('?', 1)[0] or 'unknown'}"
+            )
+
+    async def connect(self):
+        """Create the connection pool; called once at application startup
+
+        Query methods read ``self._pool`` directly, so this must run before
+        any of them.
+        """
+        await self.get_pool()
 
     async def get_pool(self) -> asyncpg.Pool:
         """Get or create connection pool with retry logic"""
         if self._pool is None:
-            max_retries = 5
-            retry_delay = 2
-
-            for attempt in range(max_retries):
-                try:
-                    print(
-                        f"Attempting database connection (attempt {attempt + 1}/{max_retries})..."
-                    )
-                    self._pool = await asyncpg.create_pool(self.db_url,
-                                                           min_size=1,
-                                                           max_size=10,
-                                                           command_timeout=60,
-                                                           timeout=30)
+            async with self._pool_lock:
+                # Re-check under the lock: a concurrent caller may have created it
+                if self._pool is None:
+                    try:
+                        # Fast path: a reachable database connects on the first attempt
+                        self._pool = await self._create_pool()
+                    except Exception as e:
+                        self._pool = await self._retry_create_pool(e)
                     print("Database connection pool created successfully")
-                    break
-                except Exception as e:
-                    error_msg = str(e)
-                    print(
-                        f"Database connection attempt {attempt + 1} failed: {error_msg}"
-                    )
-
-                    if attempt < max_retries - 1:
-                        wait_time = retry_delay * (2**attempt)
-                        print(f"Retrying in {wait_time} seconds...")
-                        await asyncio.sleep(wait_time)
-                    else:
-                        print(f"All {max_retries} connection attempts failed")
-                        raise Exception(
-                            f"Failed to connect to database after {max_retries} attempts: {error_msg}"
-                        )
 
         return self._pool
 
+    async def _create_pool(self) -> asyncpg.Pool:
+        """Create the asyncpg connection pool"""
+        # create_pool opens min_size connections up front and runs
+        # _init_connection on each, so the pool is warm once this returns.
+        # One pool is shared by the whole process; size DB_POOL_MIN to the
+        # usual number of concurrent requests and DB_POOL_MAX to the peak.
+        return await asyncpg.create_pool(self.db_url,
+                                         min_size=self._pool_min_size,
+                                         max_size=self._pool_max_size,
+                                         max_queries=50000,
+                                         max_inactive_connection_lifetime=self._pool_max_idle,
+                                         command_timeout=60,
+                                         timeout=30,
+                                         # Keep every distinct query prepared for the connection's lifetime,
+                                         # except behind PgBouncer in transaction mode where that breaks
+                                         statement_cache_size=0 if self._pgbouncer else 1024,
+                                         max_cached_statement_lifetime=0,
+                                         max_cacheable_statement_size=0,
+                                         init=self._init_connection)
+
+    async def _retry_create_pool(self, first_error: Exception) -> asyncpg.Pool:
+        """Retry pool creation with exponential backoff after a failed first attempt"""
+        max_retries = 5
+        retry_delay = 2
+        error_msg = str(first_error)
+
+        for attempt in range(1, max_retries):
+            print(f"Database connection attempt {attempt} failed: {error_msg}")
+            wait_time = retry_delay * (2**(attempt - 1))
+            print(f"Retrying in {wait_time} seconds...")
+            await asyncio.sleep(wait_time)
+
+            try:
+                print(
+                    f"Attempting database connection (attempt {attempt + 1}/{max_retries})..."
+                )
+                return await self._create_pool()
+            except Exception as e:
+                error_msg = str(e)
+
+        print(f"Database connection attempt {max_retries} failed: {error_msg}")
+        print(f"All {max_retries} connection attempts failed")
+        raise Exception(
+            f"Failed to connect to database after {max_retries} attempts: {error_msg}"
+        )
+
+    async def _init_connection(self, conn: asyncpg.Connection):
+        """Set up codecs when the pool opens a new connection
+
+        Nothing here may touch application tables: the pool is created before
+        init_db and check_and_migrate_db have run.
+        """
+        # Decode DATE columns straight to ISO strings (the form the Pydantic models use)
+        await conn.set_type_codec('date',
+                                  encoder=date.isoformat,
+                                  decoder=str,
+                                  schema='pg_catalog',
+                                  format='text')
+
     async def close(self):
         """Close the connection pool"""
         if self._pool:
@@ -73,506 +297,483 @@ class Database:
         """Check if database connection is configured"""
         return self.db_url is not None and len(self.db_url) > 0
 
-    async def _table_exists(self, conn, table_name: str) -> bool:
-        """Check if a table exists in the database"""
-        result = await conn.fetchval(
-            "SELECT EXISTS(SELECT 1 FROM information_schema.tables WHERE table_name = $1)",
-            table_name)
-        return result
+    async def _load_schema_snapshot(self, conn, tables: List[str]) -> Dict[str, Set[str]]:
+        """Load existing columns for the given tables in a single query
 
-    async def _column_exists(self, conn, table_name: str,
-                             column_name: str) -> bool:
-        """Check if a column exists in a table"""
-        try:
-            result = await conn.fetchval(
-                """SELECT EXISTS(
-                    SELECT 1 FROM information_schema.columns 
-                    WHERE table_name = $1 AND column_name = $2
-                )""", table_name, column_name)
-            return result
-        except:
-            return False
+        Tables that do not exist are absent from the returned mapping.
+        """
+        rows = await conn.fetch(
+            """
+            SELECT table_name, array_agg(column_name::text) AS columns
+            FROM information_schema.columns
+            WHERE table_schema = current_schema() AND table_name = ANY($1::text[])
+            GROUP BY table_name
+        """, tables)
+        return {row['table_name']: set(row['columns']) for row in rows}
 
     async def _ensure_config_rows(self, conn, config_dict: dict = None):
-        """Ensure all config tables have their default rows"""
-        count = await conn.fetchval("SELECT COUNT(*) FROM admin_config")
-        if count == 0:
-            admin_username = "admin"
-            admin_password = "admin"
-            api_key = "han1234"
-            error_ban_threshold = 3
-            task_retry_enabled = True
-            task_max_retries = 3
-            auto_disable_on_401 = True
-
-            if config_dict:
-                global_config = config_dict.get("global", {})
-                admin_username = global_config.get("admin_username", "admin")
-                admin_password = global_config.get("admin_password", "admin")
-                api_key = global_config.get("api_key", "han1234")
-
-                admin_config = config_dict.get("admin", {})
-                error_ban_threshold = admin_config.get("error_ban_threshold", 3)
-                task_retry_enabled = admin_config.get("task_retry_enabled", True)
-                task_max_retries = admin_config.get("task_max_retries", 3)
-                auto_disable_on_401 = admin_config.get("auto_disable_on_401", True)
-
-            await conn.execute("""
-                INSERT INTO admin_config (id, admin_username, admin_password, api_key, error_ban_threshold, task_retry_enabled, task_max_retries, auto_disable_on_401)
-                VALUES (1, $1, $2, $3, $4, $5, $6, $7)
-            """, admin_username, admin_password, api_key, error_ban_threshold, task_retry_enabled, task_max_retries, auto_disable_on_401)
+        """Ensure all config tables have their default rows
 
-        count = await conn.fetchval("SELECT COUNT(*) FROM proxy_config")
-        if count == 0:
-            proxy_enabled = False
-            proxy_url = None
-
-            if config_dict:
-                proxy_config = config_dict.get("proxy", {})
-                proxy_enabled = proxy_config.get("proxy_enabled", False)
-                proxy_url = proxy_config.get("proxy_url", "")
-                proxy_url = proxy_url if proxy_url else None
-
-            await conn.execute(
-                """
-                INSERT INTO proxy_config (id, proxy_enabled, proxy_url)
-                VALUES (1, $1, $2)
-            """, proxy_enabled, proxy_url)
-
-        count = await conn.fetchval(
-            "SELECT COUNT(*) FROM watermark_free_config")
-        if count == 0:
-            watermark_free_enabled = False
-            parse_method = "third_party"
-            custom_parse_url = None
-            custom_parse_token = None
-            fallback_on_failure = True
-
-            if config_dict:
-                watermark_config = config_dict.get("watermark_free", {})
-                watermark_free_enabled = watermark_config.get(
-                    "watermark_free_enabled", False)
-                parse_method = watermark_config.get("parse_method",
-                                                    "third_party")
-                custom_parse_url = watermark_config.get("custom_parse_url", "")
-                custom_parse_token = watermark_config.get("custom_parse_token", "")
-                fallback_on_failure = watermark_config.get("fallback_on_failure", True)
-
-                # Convert empty strings to None
-                custom_parse_url = custom_parse_url if custom_parse_url else None
-                custom_parse_token = custom_parse_token if custom_parse_token else None
+        Every config table is a singleton keyed by id = 1, so seeding is an
+        INSERT ... ON CONFLICT (id) DO NOTHING that leaves existing rows untouched.
+        """
+        admin_username = "admin"
+        admin_password = "admin"
+        api_key = "han1234"
+        error_ban_threshold = 3
+        task_retry_enabled = True
+        task_max_retries = 3
+        auto_disable_on_401 = True
+
+        if config_dict:
+            global_config = config_dict.get("global", {})
+            admin_username = global_config.get("admin_username", "admin")
+            admin_password = global_config.get("admin_password", "admin")
+            api_key = global_config.get("api_key", "han1234")
+
+            admin_config = config_dict.get("admin", {})
+            error_ban_threshold = admin_config.get("error_ban_threshold", 3)
+            task_retry_enabled = admin_config.get("task_retry_enabled", True)
+            task_max_retries = admin_config.get("task_max_retries", 3)
+            auto_disable_on_401 = admin_config.get("auto_disable_on_401", True)
+
+        proxy_enabled = False
+        proxy_url = None
+
+        if config_dict:
+            proxy_config = config_dict.get("proxy", {})
+            proxy_enabled = proxy_config.get("proxy_enabled", False)
+            proxy_url = proxy_config.get("proxy_url", "")
+            proxy_url = proxy_url if proxy_url else None
+
+        watermark_free_enabled = False
+        parse_method = "third_party"
+        custom_parse_url = None
+        custom_parse_token = None
+        fallback_on_failure = True
+
+        if config_dict:
+            watermark_config = config_dict.get("watermark_free", {})
+            watermark_free_enabled = watermark_config.get(
+                "watermark_free_enabled", False)
+            parse_method = watermark_config.get("parse_method",
+                                                "third_party")
+            custom_parse_url = watermark_config.get("custom_parse_url", "")
+            custom_parse_token = watermark_config.get("custom_parse_token", "")
+            fallback_on_failure = watermark_config.get("fallback_on_failure", True)
+
+            # Convert empty strings to None
+            custom_parse_url = custom_parse_url if custom_parse_url else None
+            custom_parse_token = custom_parse_token if custom_parse_token else None
+
+        cache_enabled = False
+        cache_timeout = 600
+        cache_base_url = None
+
+        if config_dict:
+            cache_config = config_dict.get("cache", {})
+            cache_enabled = cache_config.get("enabled", False)
+            cache_timeout = cache_config.get("timeout", 600)
+            cache_base_url = cache_config.get("base_url", "")
+            cache_base_url = cache_base_url if cache_base_url else None
+
+        image_timeout = 300
+        video_timeout = 3000
+
+        if config_dict:
+            generation_config = config_dict.get("generation", {})
+            image_timeout = generation_config.get("image_timeout", 300)
+            video_timeout = generation_config.get("video_timeout", 3000)
+
+        at_auto_refresh_enabled = False
+
+        if config_dict:
+            token_refresh_config = config_dict.get("token_refresh", {})
+            at_auto_refresh_enabled = token_refresh_config.get(
+                "at_auto_refresh_enabled", False)
+
+        # Get call logic config from config_dict if provided, otherwise use defaults
+        call_mode = "default"
+        polling_mode_enabled = False
+
+        if config_dict:
+            call_logic_config = config_dict.get("call_logic", {})
+            call_mode = call_logic_config.get("call_mode", "default")
+            # Normalize call_mode
+            if call_mode not in ("default", "polling"):
+                # Check legacy polling_mode_enabled field
+                polling_mode_enabled = call_logic_config.get("polling_mode_enabled", False)
+                call_mode = "polling" if polling_mode_enabled else "default"
+            else:
+                polling_mode_enabled = call_mode == "polling"
+
+        # Get POW proxy config from config_dict if provided, otherwise use defaults
+        pow_proxy_enabled = False
+        pow_proxy_url = None
+
+        if config_dict:
+            pow_proxy_config = config_dict.get("pow_proxy", {})
+            pow_proxy_enabled = pow_proxy_config.get("pow_proxy_enabled", False)
+            pow_proxy_url = pow_proxy_config.get("pow_proxy_url", "")
+            # Convert empty string to None
+            pow_proxy_url = pow_proxy_url if pow_proxy_url else None
+
+        seeds = [
+            ("admin_config",
+             ("admin_username", "admin_password", "api_key", "error_ban_threshold",
+              "task_retry_enabled", "task_max_retries", "auto_disable_on_401"),
+             (admin_username, admin_password, api_key, error_ban_threshold,
+              task_retry_enabled, task_max_retries, auto_disable_on_401)),
+            ("proxy_config",
+             ("proxy_enabled", "proxy_url"),
+             (proxy_enabled, proxy_url)),
+            ("watermark_free_config",
+             ("watermark_free_enabled", "parse_method", "custom_parse_url",
+              "custom_parse_token", "fallback_on_failure"),
+             (watermark_free_enabled, parse_method, custom_parse_url,
+              custom_parse_token, fallback_on_failure)),
+            ("cache_config",
+             ("cache_enabled", "cache_timeout", "cache_base_url"),
+             (cache_enabled, cache_timeout, cache_base_url)),
+            ("generation_config",
+             ("image_timeout", "video_timeout"),
+             (image_timeout, video_timeout)),
+            ("token_refresh_config",
+             ("at_auto_refresh_enabled",),
+             (at_auto_refresh_enabled,)),
+            ("call_logic_config",
+             ("call_mode", "polling_mode_enabled"),
+             (call_mode, polling_mode_enabled)),
+            ("pow_proxy_config",
+             ("pow_proxy_enabled", "pow_proxy_url"),
+             (pow_proxy_enabled, pow_proxy_url)),
+        ]
+
+        # Seed every table with one statement: each INSERT is a writable CTE
+        ctes = []
+        params = []
+        for table_name, columns, values in seeds:
+            placeholders = ", ".join(
+                f"${len(params) + i}" for i in range(1, len(values) + 1))
+            ctes.append(
+                f"seed_{table_name} AS (INSERT INTO {table_name} (id, {', '.join(columns)}) "
+                f"VALUES (1, {placeholders}) ON CONFLICT (id) DO NOTHING)")
+            params.extend(values)
+
+        await conn.execute(f"WITH {', '.join(ctes)} SELECT 1", *params)
 
-            await conn.execute("""
-                INSERT INTO watermark_free_config (id, watermark_free_enabled, parse_method, custom_parse_url, custom_parse_token, fallback_on_failure)
-                VALUES (1, $1, $2, $3, $4, $5)
-            """, watermark_free_enabled, parse_method, custom_parse_url, custom_parse_token, fallback_on_failure)
-
-        count = await conn.fetchval("SELECT COUNT(*) FROM cache_config")
-        if count == 0:
-            cache_enabled = False
-            cache_timeout = 600
-            cache_base_url = None
-
-            if config_dict:
-                cache_config = config_dict.get("cache", {})
-                cache_enabled = cache_config.get("enabled", False)
-                cache_timeout = cache_config.get("timeout", 600)
-                cache_base_url = cache_config.get("base_url", "")
-                cache_base_url = cache_base_url if cache_base_url else None
+    async def check_and_migrate_db(self, config_dict: dict = None):
+        """Check database integrity and perform migrations if needed
 
-            await conn.execute(
-                """
-                INSERT INTO cache_config (id, cache_enabled, cache_timeout, cache_base_url)
-                VALUES (1, $1, $2, $3)
-            """, cache_enabled, cache_timeout, cache_base_url)
+        Set SKIP_DB_MIGRATION=1 to skip the migrations, e.g. on production pods
+        where they are run once by a dedicated admin process instead of on
+        every startup. Missing config rows are still seeded.
+        """
+        if os.environ.get("SKIP_DB_MIGRATION") == "1":
+            print("SKIP_DB_MIGRATION=1 set, skipping database migration check.")
+            # Still seed missing config rows, or updates to them would match nothing
+            async with self._pool.acquire() as conn:
+                await self._ensure_config_rows(conn, config_dict)
+            return
+
+        migrations = {
+            "tokens": [
+                ("sora2_supported", "BOOLEAN"),
+                ("sora2_invite_code", "TEXT"),
+                ("sora2_redeemed_count", "INTEGER DEFAULT 0"),
+                ("sora2_total_count", "INTEGER DEFAULT 0"),
+                ("sora2_remaining_count", "INTEGER DEFAULT 0"),
+                ("sora2_cooldown_until", "TIMESTAMP"),
+                ("image_enabled", "BOOLEAN DEFAULT TRUE"),
+                ("video_enabled", "BOOLEAN DEFAULT TRUE"),
+                ("image_concurrency", "INTEGER DEFAULT -1"),
+                ("video_concurrency", "INTEGER DEFAULT -1"),
+                ("client_id", "TEXT"),
+                ("proxy_url", "TEXT"),
+                ("is_expired", "BOOLEAN DEFAULT FALSE"),
+            ],
+            "token_stats": [
+                ("consecutive_error_count", "INTEGER DEFAULT 0"),
+            ],
+            "admin_config": [
+                ("admin_username", "TEXT DEFAULT 'admin'"),
+                ("admin_password", "TEXT DEFAULT 'admin'"),
+                ("api_key", "TEXT DEFAULT 'han1234'"),
+                ("task_retry_enabled", "BOOLEAN DEFAULT TRUE"),
+                ("task_max_retries", "INTEGER DEFAULT 3"),
+                ("auto_disable_on_401", "BOOLEAN DEFAULT TRUE"),
+            ],
+            "watermark_free_config": [
+                ("parse_method", "TEXT DEFAULT 'third_party'"),
+                ("custom_parse_url", "TEXT"),
+                ("custom_parse_token", "TEXT"),
+                ("fallback_on_failure", "BOOLEAN DEFAULT TRUE"),
+            ],
+            "request_logs": [
+                ("task_id", "TEXT"),
+                ("updated_at", "TIMESTAMP"),
+            ],
+            "tasks": [
+                ("retry_count", "INTEGER DEFAULT 0"),
+            ],
+        }
+
+        pool = self._pool
+        async with pool.acquire() as conn:
+            version = await conn.fetchval(
+                "SELECT version FROM schema_version WHERE id = 1 LIMIT 1")
+            if version == EXPECTED_SCHEMA_VERSION:
+                print(f"Database schema is up to date (version {version}), skipping migrations.")
+                # Still re-seed any missing config row; it is one idempotent statement
+                await self._ensure_config_rows(conn, config_dict)
+                return
 
-        count = await conn.fetchval("SELECT COUNT(*) FROM generation_config")
-        if count == 0:
-            image_timeout = 300
-            video_timeout = 3000
+            print("Checking database integrity and performing migrations...")
 
-            if config_dict:
-                generation_config = config_dict.get("generation", {})
-                image_timeout = generation_config.get("image_timeout", 300)
-                video_timeout = generation_config.get("video_timeout", 3000)
+            schema = await self._load_schema_snapshot(conn, list(migrations))
+            migration_failed = False
 
-            await conn.execute(
-                """
-                INSERT INTO generation_config (id, image_timeout, video_timeout)
-                VALUES (1, $1, $2)
-            """, image_timeout, video_timeout)
+            for table_name, columns_to_add in migrations.items():
+                if table_name not in schema:
+                    continue
 
-        count = await conn.fetchval("SELECT COUNT(*) FROM token_refresh_config")
-        if count == 0:
-            at_auto_refresh_enabled = False
+                missing = [(col_name, col_type)
+                           for col_name, col_type in columns_to_add
+                           if col_name not in schema[table_name]]
+                if not missing:
+                    continue
 
-            if config_dict:
-                token_refresh_config = config_dict.get("token_refresh", {})
-                at_auto_refresh_enabled = token_refresh_config.get(
-                    "at_auto_refresh_enabled", False)
+                # One ALTER TABLE per table, with one ADD COLUMN clause per missing column
+                clauses = ", ".join(
+                    f"ADD COLUMN IF NOT EXISTS {col_name} {col_type}"
+                    for col_name, col_type in missing)
+                col_names = ", ".join(col_name for col_name, _ in missing)
+                try:
+                    await conn.execute(f"ALTER TABLE {table_name} {clauses}")
+                    print(f"  Added columns to {table_name} table: {col_names}")
+                except Exception as e:
+                    print(f"  Failed to add columns to {table_name} table ({col_names}): {e}")
+                    migration_failed = True
 
-            await conn.execute(
+            # Singleton tables only ever hold id = 1. NOT VALID enforces that for
+            # new writes without failing on a stray legacy row.
+            existing = await conn.fetch(
                 """
-                INSERT INTO token_refresh_config (id, at_auto_refresh_enabled)
-                VALUES (1, $1)
-            """, at_auto_refresh_enabled)
-
-        # Ensure call_logic_config has a row
-        count = await conn.fetchval("SELECT COUNT(*) FROM call_logic_config")
-        if count == 0:
-            # Get call logic config from config_dict if provided, otherwise use defaults
-            call_mode = "default"
-            polling_mode_enabled = False
-
-            if config_dict:
-                call_logic_config = config_dict.get("call_logic", {})
-                call_mode = call_logic_config.get("call_mode", "default")
-                # Normalize call_mode
-                if call_mode not in ("default", "polling"):
-                    # Check legacy polling_mode_enabled field
-                    polling_mode_enabled = call_logic_config.get("polling_mode_enabled", False)
-                    call_mode = "polling" if polling_mode_enabled else "default"
-                else:
-                    polling_mode_enabled = call_mode == "polling"
-
-            await conn.execute("""
-                INSERT INTO call_logic_config (id, call_mode, polling_mode_enabled)
-                VALUES (1, $1, $2)
-            """, call_mode, polling_mode_enabled)
-
-        # Ensure pow_proxy_config has a row
-        count = await conn.fetchval("SELECT COUNT(*) FROM pow_proxy_config")
-        if count == 0:
-            # Get POW proxy config from config_dict if provided, otherwise use defaults
-            pow_proxy_enabled = False
-            pow_proxy_url = None
-
-            if config_dict:
-                pow_proxy_config = config_dict.get("pow_proxy", {})
-                pow_proxy_enabled = pow_proxy_config.get("pow_proxy_enabled", False)
-                pow_proxy_url = pow_proxy_config.get("pow_proxy_url", "")
-                # Convert empty string to None
-                pow_proxy_url = pow_proxy_url if pow_proxy_url else None
-
-            await conn.execute("""
-                INSERT INTO pow_proxy_config (id, pow_proxy_enabled, pow_proxy_url)
-                VALUES (1, $1, $2)
-            """, pow_proxy_enabled, pow_proxy_url)
-
-    async def check_and_migrate_db(self, config_dict: dict = None):
-        """Check database integrity and perform migrations if needed"""
-        pool = await self.get_pool()
-        async with pool.acquire() as conn:
-            print("Checking database integrity and performing migrations...")
-
-            if await self._table_exists(conn, "tokens"):
-                columns_to_add = [
-                    ("sora2_supported", "BOOLEAN"),
-                    ("sora2_invite_code", "TEXT"),
-                    ("sora2_redeemed_count", "INTEGER DEFAULT 0"),
-                    ("sora2_total_count", "INTEGER DEFAULT 0"),
-                    ("sora2_remaining_count", "INTEGER DEFAULT 0"),
-                    ("sora2_cooldown_until", "TIMESTAMP"),
-                    ("image_enabled", "BOOLEAN DEFAULT TRUE"),
-                    ("video_enabled", "BOOLEAN DEFAULT TRUE"),
-                    ("image_concurrency", "INTEGER DEFAULT -1"),
-                    ("video_concurrency", "INTEGER DEFAULT -1"),
-                    ("client_id", "TEXT"),
-                    ("proxy_url", "TEXT"),
-                    ("is_expired", "BOOLEAN DEFAULT FALSE"),
-                ]
-
-                for col_name, col_type in columns_to_add:
-                    if not await self._column_exists(conn, "tokens", col_name):
-                        try:
-                            await conn.execute(
-                                f"ALTER TABLE tokens ADD COLUMN {col_name} {col_type}"
-                            )
-                            print(
-                                f"  Added column '{col_name}' to tokens table")
-                        except Exception as e:
-                            print(f"  Failed to add column '{col_name}': {e}")
-
-            if await self._table_exists(conn, "token_stats"):
-                columns_to_add = [
-                    ("consecutive_error_count", "INTEGER DEFAULT 0"),
-                ]
-
-                for col_name, col_type in columns_to_add:
-                    if not await self._column_exists(conn, "token_stats",
-                                                     col_name):
-                        try:
-                            await conn.execute(
-                                f"ALTER TABLE token_stats ADD COLUMN {col_name} {col_type}"
-                            )
-                            print(
-                                f"  Added column '{col_name}' to token_stats table"
-                            )
-                        except Exception as e:
-                            print(f"  Failed to add column '{col_name}': {e}")
-
-            if await self._table_exists(conn, "admin_config"):
-                columns_to_add = [
-                    ("admin_username", "TEXT DEFAULT 'admin'"),
-                    ("admin_password", "TEXT DEFAULT 'admin'"),
-                    ("api_key", "TEXT DEFAULT 'han1234'"),
-                    ("task_retry_enabled", "BOOLEAN DEFAULT TRUE"),
-                    ("task_max_retries", "INTEGER DEFAULT 3"),
-                    ("auto_disable_on_401", "BOOLEAN DEFAULT TRUE"),
-                ]
-
-                for col_name, col_type in columns_to_add:
-                    if not await self._column_exists(conn, "admin_config",
-                                                     col_name):
-                        try:
-                            await conn.execute(
-                                f"ALTER TABLE admin_config ADD COLUMN {col_name} {col_type}"
-                            )
-                            print(
-                                f"  Added column '{col_name}' to admin_config table"
-                            )
-                        except Exception as e:
-                            print(f"  Failed to add column '{col_name}': {e}")
-
-            if await self._table_exists(conn, "watermark_free_config"):
-                columns_to_add = [
-                    ("parse_method", "TEXT DEFAULT 'third_party'"),
-                    ("custom_parse_url", "TEXT"),
-                    ("custom_parse_token", "TEXT"),
-                    ("fallback_on_failure", "BOOLEAN DEFAULT TRUE"),
-                ]
-
-                for col_name, col_type in columns_to_add:
-                    if not await self._column_exists(
-                            conn, "watermark_free_config", col_name):
-                        try:
-                            await conn.execute(
-                                f"ALTER TABLE watermark_free_config ADD COLUMN {col_name} {col_type}"
-                            )
-                            print(
-                                f"  Added column '{col_name}' to watermark_free_config table"
-                            )
-                        except Exception as e:
-                            print(f"  Failed to add column '{col_name}': {e}")
-
-            if await self._table_exists(conn, "request_logs"):
-                columns_to_add = [
-                    ("task_id", "TEXT"),
-                    ("updated_at", "TIMESTAMP"),
-                ]
-
-                for col_name, col_type in columns_to_add:
-                    if not await self._column_exists(conn, "request_logs",
-                                                     col_name):
-                        try:
-                            await conn.execute(
-                                f"ALTER TABLE request_logs ADD COLUMN {col_name} {col_type}"
-                            )
-                            print(
-                                f"  Added column '{col_name}' to request_logs table"
-                            )
-                        except Exception as e:
-                            print(f"  Failed to add column '{col_name}': {e}")
-
-            if await self._table_exists(conn, "tasks"):
-                # Migration: Add retry_count column to tasks table if it doesn't exist
-                if not await self._column_exists(conn, "tasks", "retry_count"):
-                    try:
-                        await conn.execute("ALTER TABLE tasks ADD COLUMN retry_count INTEGER DEFAULT 0")
-                        print("  Added column 'retry_count' to tasks table")
-                    except Exception as e:
-                        print(f"  Failed to add column 'retry_count': {e}")
+                SELECT conname FROM pg_constraint
+                WHERE connamespace = current_schema()::regnamespace AND conname = ANY($1::text[])
+            """,
+                [f"{table}_singleton" for table in _SINGLETON_TABLES])
+            existing_names = {row["conname"] for row in existing}
+            for table_name in _SINGLETON_TABLES:
+                constraint = f"{table_name}_singleton"
+                if constraint in existing_names:
+                    continue
+                try:
+                    await conn.execute(
+                        f"ALTER TABLE {table_name} ADD CONSTRAINT {constraint} CHECK (id = 1) NOT VALID")
+                    print(f"  Added {constraint} constraint")
+                except Exception as e:
+                    print(f"  Failed to add {constraint} constraint: {e}")
+                    migration_failed = True
+
+            # request_logs is high-volume telemetry that can tolerate loss on a
+            # crash, so it is kept out of the WAL (and off streaming replicas)
+            persistence = await conn.fetchval(
+                "SELECT relpersistence::text FROM pg_class WHERE oid = to_regclass('request_logs')")
+            if persistence == "p":
+                try:
+                    await conn.execute("ALTER TABLE request_logs SET UNLOGGED")
+                    print("  Converted request_logs to an UNLOGGED table")
+                except Exception as e:
+                    print(f"  Failed to convert request_logs to UNLOGGED: {e}")
+                    migration_failed = True
 
             await self._ensure_config_rows(conn, config_dict)
+
+            # Only record the version once every migration has been applied,
+            # so a failed step is retried on the next startup
+            if not migration_failed:
+                await conn.execute("""
+                    INSERT INTO schema_version (id, version) VALUES (1, $1)
+                    ON CONFLICT (id) DO UPDATE SET version = EXCLUDED.version, updated_at = CURRENT_TIMESTAMP
+                """, EXPECTED_SCHEMA_VERSION)
             print("Database migration check completed.")
 
     async def init_db(self):
         """Initialize database tables"""
-        pool = await self.get_pool()
+        pool = self._pool
         async with pool.acquire() as conn:
-            await conn.execute("""
-                CREATE TABLE IF NOT EXISTS tokens (
-                    id SERIAL PRIMARY KEY,
-                    token TEXT UNIQUE NOT NULL,
-                    email TEXT NOT NULL,
-                    username TEXT NOT NULL,
-                    name TEXT NOT NULL,
-                    st TEXT,
-                    rt TEXT,
-                    client_id TEXT,
-                    proxy_url TEXT,
-                    remark TEXT,
-                    expiry_time TIMESTAMP,
-                    is_active BOOLEAN DEFAULT TRUE,
-                    cooled_until TIMESTAMP,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    last_used_at TIMESTAMP,
-                    use_count INTEGER DEFAULT 0,
-                    plan_type TEXT,
-                    plan_title TEXT,
-                    subscription_end TIMESTAMP,
-                    sora2_supported BOOLEAN,
-                    sora2_invite_code TEXT,
-                    sora2_redeemed_count INTEGER DEFAULT 0,
-                    sora2_total_count INTEGER DEFAULT 0,
-                    sora2_remaining_count INTEGER DEFAULT 0,
-                    sora2_cooldown_until TIMESTAMP,
-                    image_enabled BOOLEAN DEFAULT TRUE,
-                    video_enabled BOOLEAN DEFAULT TRUE,
-                    image_concurrency INTEGER DEFAULT -1,
-                    video_concurrency INTEGER DEFAULT -1,
-                    is_expired BOOLEAN DEFAULT FALSE
-                )
-            """)
-
-            await conn.execute("""
-                CREATE TABLE IF NOT EXISTS token_stats (
-                    id SERIAL PRIMARY KEY,
-                    token_id INTEGER NOT NULL,
-                    image_count INTEGER DEFAULT 0,
-                    video_count INTEGER DEFAULT 0,
-                    error_count INTEGER DEFAULT 0,
-                    last_error_at TIMESTAMP,
-                    today_image_count INTEGER DEFAULT 0,
-                    today_video_count INTEGER DEFAULT 0,
-                    today_error_count INTEGER DEFAULT 0,
-                    today_date DATE,
-                    consecutive_error_count INTEGER DEFAULT 0,
-                    FOREIGN KEY (token_id) REFERENCES tokens(id)
-                )
-            """)
-
-            await conn.execute("""
-                CREATE TABLE IF NOT EXISTS tasks (
-                    id SERIAL PRIMARY KEY,
-                    task_id TEXT UNIQUE NOT NULL,
-                    token_id INTEGER NOT NULL,
-                    model TEXT NOT NULL,
-                    prompt TEXT NOT NULL,
-                    status TEXT NOT NULL DEFAULT 'processing',
-                    progress FLOAT DEFAULT 0,
-                    result_urls TEXT,
-                    error_message TEXT,
-                    retry_count INTEGER DEFAULT 0,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    completed_at TIMESTAMP,
-                    FOREIGN KEY (token_id) REFERENCES tokens(id)
-                )
-            """)
-
-            await conn.execute("""
-                CREATE TABLE IF NOT EXISTS request_logs (
-                    id SERIAL PRIMARY KEY,
-                    token_id INTEGER,
-                    task_id TEXT,
-                    operation TEXT NOT NULL,
-                    request_body TEXT,
-                    response_body TEXT,
-                    status_code INTEGER NOT NULL,
-                    duration FLOAT NOT NULL,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP,
-                    FOREIGN KEY (token_id) REFERENCES tokens(id)
-                )
-            """)
-
-            await conn.execute("""
-                CREATE TABLE IF NOT EXISTS admin_config (
-                    id INTEGER PRIMARY KEY DEFAULT 1,
-                    admin_username TEXT DEFAULT 'admin',
-                    admin_password TEXT DEFAULT 'admin',
-                    api_key TEXT DEFAULT 'han1234',
-                    error_ban_threshold INTEGER DEFAULT 3,
-                    task_retry_enabled BOOLEAN DEFAULT TRUE,
-                    task_max_retries INTEGER DEFAULT 3,
-                    auto_disable_on_401 BOOLEAN DEFAULT TRUE,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-
-            await conn.execute("""
-                CREATE TABLE IF NOT EXISTS proxy_config (
-                    id INTEGER PRIMARY KEY DEFAULT 1,
-                    proxy_enabled BOOLEAN DEFAULT FALSE,
-                    proxy_url TEXT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-
-            await conn.execute("""
-                CREATE TABLE IF NOT EXISTS watermark_free_config (
-                    id INTEGER PRIMARY KEY DEFAULT 1,
-                    watermark_free_enabled BOOLEAN DEFAULT FALSE,
-                    parse_method TEXT DEFAULT 'third_party',
-                    custom_parse_url TEXT,
-                    custom_parse_token TEXT,
-                    fallback_on_failure BOOLEAN DEFAULT TRUE,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-
-            await conn.execute("""
-                CREATE TABLE IF NOT EXISTS cache_config (
-                    id INTEGER PRIMARY KEY DEFAULT 1,
-                    cache_enabled BOOLEAN DEFAULT FALSE,
-                    cache_timeout INTEGER DEFAULT 600,
-                    cache_base_url TEXT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-
-            await conn.execute("""
-                CREATE TABLE IF NOT EXISTS generation_config (
-                    id INTEGER PRIMARY KEY DEFAULT 1,
-                    image_timeout INTEGER DEFAULT 300,
-                    video_timeout INTEGER DEFAULT 3000,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-
-            await conn.execute("""
-                CREATE TABLE IF NOT EXISTS token_refresh_config (
-                    id INTEGER PRIMARY KEY DEFAULT 1,
-                    at_auto_refresh_enabled BOOLEAN DEFAULT FALSE,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-
-            # Call logic config table
-            await conn.execute("""
-                CREATE TABLE IF NOT EXISTS call_logic_config (
-                    id INTEGER PRIMARY KEY DEFAULT 1,
-                    call_mode TEXT DEFAULT 'default',
-                    polling_mode_enabled BOOLEAN DEFAULT FALSE,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-
-            # POW proxy config table
-            await conn.execute("""
-                CREATE TABLE IF NOT EXISTS pow_proxy_config (
-                    id INTEGER PRIMARY KEY DEFAULT 1,
-                    pow_proxy_enabled BOOLEAN DEFAULT FALSE,
-                    pow_proxy_url TEXT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-
-            # Create indexes
-            await conn.execute(
-                "CREATE INDEX IF NOT EXISTS idx_task_id ON tasks(task_id)")
-            await conn.execute(
-                "CREATE INDEX IF NOT EXISTS idx_task_status ON tasks(status)")
-            await conn.execute(
-                "CREATE INDEX IF NOT EXISTS idx_token_active ON tokens(is_active)"
-            )
+            # All DDL is sent as one script in a single round-trip
+            async with conn.transaction():
+                await conn.execute("""
+                    CREATE TABLE IF NOT EXISTS tokens (
+                        id SERIAL PRIMARY KEY,
+                        token TEXT UNIQUE NOT NULL,
+                        email TEXT NOT NULL,
+                        username TEXT NOT NULL,
+                        name TEXT NOT NULL,
+                        st TEXT,
+                        rt TEXT,
+                        client_id TEXT,
+                        proxy_url TEXT,
+                        remark TEXT,
+                        expiry_time TIMESTAMP,
+                        is_active BOOLEAN DEFAULT TRUE,
+                        cooled_until TIMESTAMP,
+                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        last_used_at TIMESTAMP,
+                        use_count INTEGER DEFAULT 0,
+                        plan_type TEXT,
+                        plan_title TEXT,
+                        subscription_end TIMESTAMP,
+                        sora2_supported BOOLEAN,
+                        sora2_invite_code TEXT,
+                        sora2_redeemed_count INTEGER DEFAULT 0,
+                        sora2_total_count INTEGER DEFAULT 0,
+                        sora2_remaining_count INTEGER DEFAULT 0,
+                        sora2_cooldown_until TIMESTAMP,
+                        image_enabled BOOLEAN DEFAULT TRUE,
+                        video_enabled BOOLEAN DEFAULT TRUE,
+                        image_concurrency INTEGER DEFAULT -1,
+                        video_concurrency INTEGER DEFAULT -1,
+                        is_expired BOOLEAN DEFAULT FALSE
+                    );
+
+                    CREATE TABLE IF NOT EXISTS token_stats (
+                        id SERIAL PRIMARY KEY,
+                        token_id INTEGER NOT NULL,
+                        image_count INTEGER DEFAULT 0,
+                        video_count INTEGER DEFAULT 0,
+                        error_count INTEGER DEFAULT 0,
+                        last_error_at TIMESTAMP,
+                        today_image_count INTEGER DEFAULT 0,
+                        today_video_count INTEGER DEFAULT 0,
+                        today_error_count INTEGER DEFAULT 0,
+                        today_date DATE,
+                        consecutive_error_count INTEGER DEFAULT 0,
+                        FOREIGN KEY (token_id) REFERENCES tokens(id)
+                    );
+
+                    CREATE TABLE IF NOT EXISTS tasks (
+                        id SERIAL PRIMARY KEY,
+                        task_id TEXT UNIQUE NOT NULL,
+                        token_id INTEGER NOT NULL,
+                        model TEXT NOT NULL,
+                        prompt TEXT NOT NULL,
+                        status TEXT NOT NULL DEFAULT 'processing',
+                        progress FLOAT DEFAULT 0,
+                        result_urls TEXT,
+                        error_message TEXT,
+                        retry_count INTEGER DEFAULT 0,
+                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        completed_at TIMESTAMP,
+                        FOREIGN KEY (token_id) REFERENCES tokens(id)
+                    );
+
+                    -- Telemetry only: UNLOGGED skips WAL writes, contents are lost on a crash
+                    CREATE UNLOGGED TABLE IF NOT EXISTS request_logs (
+                        id SERIAL PRIMARY KEY,
+                        token_id INTEGER,
+                        task_id TEXT,
+                        operation TEXT NOT NULL,
+                        request_body TEXT,
+                        response_body TEXT,
+                        status_code INTEGER NOT NULL,
+                        duration FLOAT NOT NULL,
+                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        updated_at TIMESTAMP,
+                        FOREIGN KEY (token_id) REFERENCES tokens(id)
+                    );
+
+                    CREATE TABLE IF NOT EXISTS admin_config (
+                        id INTEGER PRIMARY KEY DEFAULT 1 CONSTRAINT admin_config_singleton CHECK (id = 1),
+                        admin_username TEXT DEFAULT 'admin',
+                        admin_password TEXT DEFAULT 'admin',
+                        api_key TEXT DEFAULT 'han1234',
+                        error_ban_threshold INTEGER DEFAULT 3,
+                        task_retry_enabled BOOLEAN DEFAULT TRUE,
+                        task_max_retries INTEGER DEFAULT 3,
+                        auto_disable_on_401 BOOLEAN DEFAULT TRUE,
+                        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                    );
+
+                    CREATE TABLE IF NOT EXISTS proxy_config (
+                        id INTEGER PRIMARY KEY DEFAULT 1 CONSTRAINT proxy_config_singleton CHECK (id = 1),
+                        proxy_enabled BOOLEAN DEFAULT FALSE,
+                        proxy_url TEXT,
+                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                    );
+
+                    CREATE TABLE IF NOT EXISTS watermark_free_config (
+                        id INTEGER PRIMARY KEY DEFAULT 1 CONSTRAINT watermark_free_config_singleton CHECK (id = 1),
+                        watermark_free_enabled BOOLEAN DEFAULT FALSE,
+                        parse_method TEXT DEFAULT 'third_party',
+                        custom_parse_url TEXT,
+                        custom_parse_token TEXT,
+                        fallback_on_failure BOOLEAN DEFAULT TRUE,
+                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                    );
+
+                    CREATE TABLE IF NOT EXISTS cache_config (
+                        id INTEGER PRIMARY KEY DEFAULT 1 CONSTRAINT cache_config_singleton CHECK (id = 1),
+                        cache_enabled BOOLEAN DEFAULT FALSE,
+                        cache_timeout INTEGER DEFAULT 600,
+                        cache_base_url TEXT,
+                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                    );
+
+                    CREATE TABLE IF NOT EXISTS generation_config (
+                        id INTEGER PRIMARY KEY DEFAULT 1 CONSTRAINT generation_config_singleton CHECK (id = 1),
+                        image_timeout INTEGER DEFAULT 300,
+                        video_timeout INTEGER DEFAULT 3000,
+                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                    );
+
+                    CREATE TABLE IF NOT EXISTS token_refresh_config (
+                        id INTEGER PRIMARY KEY DEFAULT 1 CONSTRAINT token_refresh_config_singleton CHECK (id = 1),
+                        at_auto_refresh_enabled BOOLEAN DEFAULT FALSE,
+                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                    );
+
+                    -- Call logic config table
+                    CREATE TABLE IF NOT EXISTS call_logic_config (
+                        id INTEGER PRIMARY KEY DEFAULT 1 CONSTRAINT call_logic_config_singleton CHECK (id = 1),
+                        call_mode TEXT DEFAULT 'default',
+                        polling_mode_enabled BOOLEAN DEFAULT FALSE,
+                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                    );
+
+                    -- POW proxy config table
+                    CREATE TABLE IF NOT EXISTS pow_proxy_config (
+                        id INTEGER PRIMARY KEY DEFAULT 1 CONSTRAINT pow_proxy_config_singleton CHECK (id = 1),
+                        pow_proxy_enabled BOOLEAN DEFAULT FALSE,
+                        pow_proxy_url TEXT,
+                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                    );
+
+                    -- Schema version table, used to skip migrations on warm restarts
+                    CREATE TABLE IF NOT EXISTS schema_version (
+                        id INTEGER PRIMARY KEY DEFAULT 1 CONSTRAINT schema_version_singleton CHECK (id = 1),
+                        version TEXT NOT NULL,
+                        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                    );
+
+                    -- Create indexes
+                    CREATE INDEX IF NOT EXISTS idx_task_id ON tasks(task_id);
+                    CREATE INDEX IF NOT EXISTS idx_task_status ON tasks(status);
+                    CREATE INDEX IF NOT EXISTS idx_token_active ON tokens(is_active);
+                    CREATE INDEX IF NOT EXISTS idx_tokens_email ON tokens(email);
+                    -- Active tokens in least-recently-used order, as get_active_tokens reads them
+                    CREATE INDEX IF NOT EXISTS idx_tokens_active_lru
+                        ON tokens (last_used_at ASC NULLS FIRST) WHERE is_active = TRUE;
+                """)
 
     async def init_config_from_toml(self,
                                     config_dict: dict,
@@ -585,7 +786,7 @@ class Database:
             is_first_startup: If True, initialize all config rows from setting.toml.
                             If False (upgrade mode), only ensure missing config rows exist with default values.
         """
-        pool = await self.get_pool()
+        pool = self._pool
         async with pool.acquire() as conn:
             if is_first_startup:
                 await self._ensure_config_rows(conn, config_dict)
@@ -593,27 +794,53 @@ class Database:
                 await self._ensure_config_rows(conn, config_dict=None)
 
     def _row_to_dict(self, row: asyncpg.Record) -> dict:
-        """Convert asyncpg Record to dictionary and format types for Pydantic"""
-        d = dict(row)
-        # Convert date to string for Pydantic model compatibility
-        if 'today_date' in d and d['today_date']:
-            from datetime import date
-            if isinstance(d['today_date'], date):
-                d['today_date'] = d['today_date'].isoformat()
-        return d
+        """Convert asyncpg Record to dictionary
+
+        DATE columns already arrive as ISO strings via the codec registered in
+        _init_connection, so no per-row type conversion is needed here. Models
+        can also be built straight from a Record (e.g. ``Token(**row)``), since
+        Record supports mapping unpacking.
+        """
+        return dict(row)
+
+    def _get_cached_token(self, token_value: str) -> Optional[Token]:
+        """Return a cached token by value if it has not expired"""
+        entry = self._token_cache.get(token_value)
+        if entry and time.monotonic() - entry[0] < _TOKEN_CACHE_TTL:
+            return entry[1]
+        return None
+
+    def _cache_token(self, token: Token):
+        """Cache a token by value, evicting the oldest entry when full"""
+        if token.token not in self._token_cache and len(self._token_cache) >= _TOKEN_CACHE_MAXSIZE:
+            _, oldest = self._token_cache.pop(next(iter(self._token_cache)))
+            self._token_cache_keys.pop(oldest.id, None)
+        self._token_cache[token.token] = (time.monotonic(), token)
+        self._token_cache_keys[token.id] = token.token
+
+    def _invalidate_token_cache(self, token_id: int):
+        """Drop a token from the value cache after it has been modified"""
+        token_value = self._token_cache_keys.pop(token_id, None)
+        if token_value is not None:
+            self._token_cache.pop(token_value, None)
 
     async def add_token(self, token: Token) -> int:
         """Add a new token"""
-        pool = await self.get_pool()
+        pool = self._pool
         async with pool.acquire() as conn:
+            # Insert the token and its stats row in one statement
             token_id = await conn.fetchval(
                 """
-                INSERT INTO tokens (token, email, username, name, st, rt, client_id, proxy_url, remark, expiry_time, is_active,
-                                   plan_type, plan_title, subscription_end, sora2_supported, sora2_invite_code,
-                                   sora2_redeemed_count, sora2_total_count, sora2_remaining_count, sora2_cooldown_until,
-                                   image_enabled, video_enabled, image_concurrency, video_concurrency)
-                VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, $13, $14, $15, $16, $17, $18, $19, $20, $21, $22, $23, $24)
-                RETURNING id
+                WITH new_token AS (
+                    INSERT INTO tokens (token, email, username, name, st, rt, client_id, proxy_url, remark, expiry_time, is_active,
+                                       plan_type, plan_title, subscription_end, sora2_supported, sora2_invite_code,
+                                       sora2_redeemed_count, sora2_total_count, sora2_remaining_count, sora2_cooldown_until,
+                                       image_enabled, video_enabled, image_concurrency, video_concurrency)
+                    VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, $13, $14, $15, $16, $17, $18, $19, $20, $21, $22, $23, $24)
+                    RETURNING id
+                )
+                INSERT INTO token_stats (token_id) SELECT id FROM new_token
+                RETURNING token_id
             """, token.token, token.email, "", token.name, token.st, token.rt,
                 token.client_id, token.proxy_url, token.remark,
                 token.expiry_time, token.is_active, token.plan_type,
@@ -624,67 +851,65 @@ class Database:
                 token.image_enabled, token.video_enabled,
                 token.image_concurrency, token.video_concurrency)
 
-            await conn.execute(
-                """
-                INSERT INTO token_stats (token_id) VALUES ($1)
-            """, token_id)
-
             return token_id
 
     async def get_token(self, token_id: int) -> Optional[Token]:
         """Get token by ID"""
-        pool = await self.get_pool()
+        pool = self._pool
         async with pool.acquire() as conn:
-            row = await conn.fetchrow("SELECT * FROM tokens WHERE id = $1",
-                                      token_id)
+            row = await conn.fetchrow(_SQL_GET_TOKEN, token_id)
             if row:
-                return Token(**self._row_to_dict(row))
+                return Token(**row)
             return None
 
     async def get_token_by_value(self, token: str) -> Optional[Token]:
-        """Get token by value"""
-        pool = await self.get_pool()
+        """Get token by value (cached for a short TTL)"""
+        cached = self._get_cached_token(token)
+        if cached is not None:
+            return cached
+
+        pool = self._pool
         async with pool.acquire() as conn:
-            row = await conn.fetchrow("SELECT * FROM tokens WHERE token = $1",
-                                      token)
+            row = await conn.fetchrow(_SQL_GET_TOKEN_BY_VALUE, token)
             if row:
-                return Token(**self._row_to_dict(row))
+                result = Token(**row)
+                self._cache_token(result)
+                return result
             return None
 
     async def get_token_by_email(self, email: str) -> Optional[Token]:
         """Get token by email"""
-        pool = await self.get_pool()
+        pool = self._pool
         async with pool.acquire() as conn:
-            row = await conn.fetchrow("SELECT * FROM tokens WHERE email = $1",
-                                      email)
+            row = await conn.fetchrow(_SQL_GET_TOKEN_BY_EMAIL, email)
             if row:
-                return Token(**self._row_to_dict(row))
+                return Token(**row)
             return None
 
     async def get_active_tokens(self) -> List[Token]:
         """Get all active tokens (enabled, not cooled down, not expired)"""
-        pool = await self.get_pool()
+        pool = self._pool
         async with pool.acquire() as conn:
-            rows = await conn.fetch("""
-                SELECT * FROM tokens
-                WHERE is_active = TRUE
-                AND (cooled_until IS NULL OR cooled_until < CURRENT_TIMESTAMP)
-                AND expiry_time > CURRENT_TIMESTAMP
-                ORDER BY last_used_at ASC NULLS FIRST
-            """)
-            return [Token(**self._row_to_dict(row)) for row in rows]
+            rows = await conn.fetch(_SQL_GET_ACTIVE_TOKENS)
+            return [Token(**row) for row in rows]
 
     async def get_all_tokens(self) -> List[Token]:
         """Get all tokens"""
-        pool = await self.get_pool()
+        pool = self._pool
         async with pool.acquire() as conn:
-            rows = await conn.fetch(
-                "SELECT * FROM tokens ORDER BY created_at DESC")
-            return [Token(**self._row_to_dict(row)) for row in rows]
+            rows = await conn.fetch(_SQL_GET_ALL_TOKENS)
+            return [Token(**row) for row in rows]
 
     async def update_token_usage(self, token_id: int):
-        """Update token usage"""
-        pool = await self.get_pool()
+        """Update token usage
+
+        While the usage writer is running the bump is only recorded in memory
+        and written by the next _flush_token_usage; otherwise it is written now.
+        """
+        if self._usage_writer_task is not None:
+            self._pending_usage[token_id] = self._pending_usage.get(token_id, 0) + 1
+            return
+        pool = self._pool
         async with pool.acquire() as conn:
             await conn.execute(
                 """
@@ -693,32 +918,83 @@ class Database:
                 WHERE id = $1
             """, token_id)
 
+    async def start_usage_writer(self):
+        """Start the background task that flushes coalesced token usage"""
+        if self._usage_writer_task is None:
+            self._usage_writer_stop.clear()
+            self._usage_writer_task = asyncio.create_task(self._usage_writer_loop())
+
+    async def stop_usage_writer(self):
+        """Stop the usage writer and flush whatever is still pending"""
+        if self._usage_writer_task:
+            # Not cancelled: a cancel landing mid-flush would drop the batch in flight
+            self._usage_writer_stop.set()
+            await self._usage_writer_task
+            self._usage_writer_task = None
+            # Bumps recorded while the last flush was running
+            await self._flush_token_usage()
+
+    async def _usage_writer_loop(self):
+        """Flush coalesced token usage every _USAGE_FLUSH_INTERVAL seconds"""
+        while not self._usage_writer_stop.is_set():
+            try:
+                await asyncio.wait_for(self._usage_writer_stop.wait(), _USAGE_FLUSH_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            await self._flush_token_usage()
+
+    async def _flush_token_usage(self):
+        """Write all pending usage bumps in a single UPDATE"""
+        if not self._pending_usage:
+            return
+        pending, self._pending_usage = self._pending_usage, {}
+        token_ids = list(pending)
+        uses = [pending[token_id] for token_id in token_ids]
+        try:
+            pool = self._pool
+            async with pool.acquire() as conn:
+                await conn.execute(
+                    """
+                    UPDATE tokens
+                    SET use_count = use_count + u.uses, last_used_at = CURRENT_TIMESTAMP
+                    FROM unnest($1::int[], $2::int[]) AS u(id, uses)
+                    WHERE tokens.id = u.id
+                """, token_ids, uses)
+        except Exception as e:
+            print(f"Failed to flush usage for {len(pending)} tokens: {e}")
+            # Merge back so the next flush retries these counts
+            for token_id, count in pending.items():
+                self._pending_usage[token_id] = self._pending_usage.get(token_id, 0) + count
+
     async def update_token_status(self, token_id: int, is_active: bool):
         """Update token status"""
-        pool = await self.get_pool()
+        pool = self._pool
         async with pool.acquire() as conn:
             await conn.execute(
                 """
                 UPDATE tokens SET is_active = $1 WHERE id = $2
             """, is_active, token_id)
+        self._invalidate_token_cache(token_id)
 
     async def mark_token_expired(self, token_id: int):
         """Mark token as expired and disable it"""
-        pool = await self.get_pool()
+        pool = self._pool
         async with pool.acquire() as conn:
             await conn.execute(
                 """
                 UPDATE tokens SET is_expired = TRUE, is_active = FALSE WHERE id = $1
             """, token_id)
+        self._invalidate_token_cache(token_id)
 
     async def clear_token_expired(self, token_id: int):
         """Clear token expired flag"""
-        pool = await self.get_pool()
+        pool = self._pool
         async with pool.acquire() as conn:
             await conn.execute(
                 """
                 UPDATE tokens SET is_expired = FALSE WHERE id = $1
             """, token_id)
+        self._invalidate_token_cache(token_id)
 
     async def update_token_sora2(self,
                                  token_id: int,
@@ -728,7 +1004,7 @@ class Database:
                                  total_count: int = 0,
                                  remaining_count: int = 0):
         """Update token Sora2 support info"""
-        pool = await self.get_pool()
+        pool = self._pool
         async with pool.acquire() as conn:
             await conn.execute(
                 """
@@ -737,44 +1013,52 @@ class Database:
                 WHERE id = $6
             """, supported, invite_code, redeemed_count, total_count,
                 remaining_count, token_id)
+        self._invalidate_token_cache(token_id)
 
     async def update_token_sora2_remaining(self, token_id: int,
                                            remaining_count: int):
         """Update token Sora2 remaining count"""
-        pool = await self.get_pool()
+        pool = self._pool
         async with pool.acquire() as conn:
             await conn.execute(
                 """
                 UPDATE tokens SET sora2_remaining_count = $1 WHERE id = $2
             """, remaining_count, token_id)
+        self._invalidate_token_cache(token_id)
 
     async def update_token_sora2_cooldown(self, token_id: int,
                                           cooldown_until: Optional[datetime]):
         """Update token Sora2 cooldown time"""
-        pool = await self.get_pool()
+        pool = self._pool
         async with pool.acquire() as conn:
             await conn.execute(
                 """
                 UPDATE tokens SET sora2_cooldown_until = $1 WHERE id = $2
             """, cooldown_until, token_id)
+        self._invalidate_token_cache(token_id)
 
     async def update_token_cooldown(self, token_id: int,
                                     cooled_until: datetime):
         """Update token cooldown"""
-        pool = await self.get_pool()
+        pool = self._pool
         async with pool.acquire() as conn:
             await conn.execute(
                 """
                 UPDATE tokens SET cooled_until = $1 WHERE id = $2
             """, cooled_until, token_id)
+        self._invalidate_token_cache(token_id)
 
     async def delete_token(self, token_id: int):
         """Delete token"""
-        pool = await self.get_pool()
+        pool = self._pool
         async with pool.acquire() as conn:
-            await conn.execute("DELETE FROM token_stats WHERE token_id = $1",
-                               token_id)
-            await conn.execute("DELETE FROM tokens WHERE id = $1", token_id)
+            await conn.execute("""
+                WITH deleted_stats AS (
+                    DELETE FROM token_stats WHERE token_id = $1
+                )
+                DELETE FROM tokens WHERE id = $1
+            """, token_id)
+        self._invalidate_token_cache(token_id)
 
     async def update_token(self,
                            token_id: int,
@@ -793,226 +1077,130 @@ class Database:
                            image_concurrency: Optional[int] = None,
                            video_concurrency: Optional[int] = None):
         """Update token"""
-        pool = await self.get_pool()
+        fields = {
+            "token": token,
+            "st": st,
+            "rt": rt,
+            "client_id": client_id,
+            "proxy_url": proxy_url,
+            "remark": remark,
+            "expiry_time": expiry_time,
+            "plan_type": plan_type,
+            "plan_title": plan_title,
+            "subscription_end": subscription_end,
+            "image_enabled": image_enabled,
+            "video_enabled": video_enabled,
+            "image_concurrency": image_concurrency,
+            "video_concurrency": video_concurrency,
+        }
+        columns = tuple(col for col, value in fields.items() if value is not None)
+        if not columns:
+            return
+
+        query = _build_update_sql("tokens", columns)
+        pool = self._pool
         async with pool.acquire() as conn:
-            updates = []
-            params = []
-            param_idx = 1
-
-            if token is not None:
-                updates.append(f"token = ${param_idx}")
-                params.append(token)
-                param_idx += 1
-
-            if st is not None:
-                updates.append(f"st = ${param_idx}")
-                params.append(st)
-                param_idx += 1
-
-            if rt is not None:
-                updates.append(f"rt = ${param_idx}")
-                params.append(rt)
-                param_idx += 1
-
-            if client_id is not None:
-                updates.append(f"client_id = ${param_idx}")
-                params.append(client_id)
-                param_idx += 1
-
-            if proxy_url is not None:
-                updates.append(f"proxy_url = ${param_idx}")
-                params.append(proxy_url)
-                param_idx += 1
-
-            if remark is not None:
-                updates.append(f"remark = ${param_idx}")
-                params.append(remark)
-                param_idx += 1
-
-            if expiry_time is not None:
-                updates.append(f"expiry_time = ${param_idx}")
-                params.append(expiry_time)
-                param_idx += 1
-
-            if plan_type is not None:
-                updates.append(f"plan_type = ${param_idx}")
-                params.append(plan_type)
-                param_idx += 1
-
-            if plan_title is not None:
-                updates.append(f"plan_title = ${param_idx}")
-                params.append(plan_title)
-                param_idx += 1
-
-            if subscription_end is not None:
-                updates.append(f"subscription_end = ${param_idx}")
-                params.append(subscription_end)
-                param_idx += 1
-
-            if image_enabled is not None:
-                updates.append(f"image_enabled = ${param_idx}")
-                params.append(image_enabled)
-                param_idx += 1
-
-            if video_enabled is not None:
-                updates.append(f"video_enabled = ${param_idx}")
-                params.append(video_enabled)
-                param_idx += 1
-
-            if image_concurrency is not None:
-                updates.append(f"image_concurrency = ${param_idx}")
-                params.append(image_concurrency)
-                param_idx += 1
-
-            if video_concurrency is not None:
-                updates.append(f"video_concurrency = ${param_idx}")
-                params.append(video_concurrency)
-                param_idx += 1
-
-            if updates:
-                params.append(token_id)
-                query = f"UPDATE tokens SET {', '.join(updates)} WHERE id = ${param_idx}"
-                await conn.execute(query, *params)
+            await conn.execute(query, *(fields[col] for col in columns), token_id)
+        self._invalidate_token_cache(token_id)
 
     async def get_token_stats(self, token_id: int) -> Optional[TokenStats]:
         """Get token statistics"""
-        pool = await self.get_pool()
+        pool = self._pool
         async with pool.acquire() as conn:
-            row = await conn.fetchrow(
-                "SELECT * FROM token_stats WHERE token_id = $1", token_id)
+            row = await conn.fetchrow(_SQL_GET_TOKEN_STATS, token_id)
             if row:
                 return TokenStats(**self._row_to_dict(row))
             return None
 
     async def increment_image_count(self, token_id: int):
         """Increment image generation count"""
-        from datetime import date
-        pool = await self.get_pool()
+        today = date.today()
+        pool = self._pool
         async with pool.acquire() as conn:
-            row = await conn.fetchrow(
-                "SELECT today_date FROM token_stats WHERE token_id = $1",
-                token_id)
-            if row and row['today_date'] != date.today():
-                await conn.execute(
-                    """
-                    UPDATE token_stats
-                    SET image_count = image_count + 1,
-                        today_image_count = 1,
-                        today_date = $1
-                    WHERE token_id = $2
-                """, date.today(), token_id)
-            else:
-                await conn.execute(
-                    """
-                    UPDATE token_stats
-                    SET image_count = image_count + 1,
-                        today_image_count = today_image_count + 1,
-                        today_date = $1
-                    WHERE token_id = $2
-                """, date.today(), token_id)
+            # Today's counter restarts at 1 when the stored date is not today
+            await conn.execute(
+                """
+                UPDATE token_stats
+                SET image_count = image_count + 1,
+                    today_image_count = CASE WHEN today_date = $1 THEN today_image_count + 1 ELSE 1 END,
+                    today_date = $1
+                WHERE token_id = $2
+            """, today, token_id)
 
     async def increment_video_count(self, token_id: int):
         """Increment video generation count"""
-        from datetime import date
-        pool = await self.get_pool()
+        today = date.today()
+        pool = self._pool
         async with pool.acquire() as conn:
-            row = await conn.fetchrow(
-                "SELECT today_date FROM token_stats WHERE token_id = $1",
-                token_id)
-            if row and row['today_date'] != date.today():
-                await conn.execute(
-                    """
-                    UPDATE token_stats
-                    SET video_count = video_count + 1,
-                        today_video_count = 1,
-                        today_date = $1
-                    WHERE token_id = $2
-                """, date.today(), token_id)
-            else:
-                await conn.execute(
-                    """
-                    UPDATE token_stats
-                    SET video_count = video_count + 1,
-                        today_video_count = today_video_count + 1,
-                        today_date = $1
-                    WHERE token_id = $2
-                """, date.today(), token_id)
+            # Today's counter restarts at 1 when the stored date is not today
+            await conn.execute(
+                """
+                UPDATE token_stats
+                SET video_count = video_count + 1,
+                    today_video_count = CASE WHEN today_date = $1 THEN today_video_count + 1 ELSE 1 END,
+                    today_date = $1
+                WHERE token_id = $2
+            """, today, token_id)
 
     async def increment_error_count(self,
                                     token_id: int,
                                     increment_consecutive: bool = True):
         """Increment error count"""
-        from datetime import date
-        pool = await self.get_pool()
+        today = date.today()
+        pool = self._pool
         async with pool.acquire() as conn:
-            row = await conn.fetchrow(
-                "SELECT today_date FROM token_stats WHERE token_id = $1",
-                token_id)
-            if row and row['today_date'] != date.today():
-                if increment_consecutive:
-                    await conn.execute(
-                        """
-                        UPDATE token_stats
-                        SET error_count = error_count + 1,
-                            consecutive_error_count = consecutive_error_count + 1,
-                            today_error_count = 1,
-                            today_date = $1,
-                            last_error_at = CURRENT_TIMESTAMP
-                        WHERE token_id = $2
-                    """, date.today(), token_id)
-                else:
-                    await conn.execute(
-                        """
-                        UPDATE token_stats
-                        SET error_count = error_count + 1,
-                            today_error_count = 1,
-                            today_date = $1,
-                            last_error_at = CURRENT_TIMESTAMP
-                        WHERE token_id = $2
-                    """, date.today(), token_id)
-            else:
-                if increment_consecutive:
-                    await conn.execute(
-                        """
-                        UPDATE token_stats
-                        SET error_count = error_count + 1,
-                            consecutive_error_count = consecutive_error_count + 1,
-                            today_error_count = today_error_count + 1,
-                            today_date = $1,
-                            last_error_at = CURRENT_TIMESTAMP
-                        WHERE token_id = $2
-                    """, date.today(), token_id)
-                else:
-                    await conn.execute(
-                        """
-                        UPDATE token_stats
-                        SET error_count = error_count + 1,
-                            today_error_count = today_error_count + 1,
-                            today_date = $1,
-                            last_error_at = CURRENT_TIMESTAMP
-                        WHERE token_id = $2
-                    """, date.today(), token_id)
+            # Today's counter restarts at 1 when the stored date is not today
+            await conn.execute(
+                """
+                UPDATE token_stats
+                SET error_count = error_count + 1,
+                    consecutive_error_count = CASE WHEN $3 THEN consecutive_error_count + 1 ELSE consecutive_error_count END,
+                    today_error_count = CASE WHEN today_date = $1 THEN today_error_count + 1 ELSE 1 END,
+                    today_date = $1,
+                    last_error_at = CURRENT_TIMESTAMP
+                WHERE token_id = $2
+            """, today, token_id, increment_consecutive)
 
     async def reset_error_count(self, token_id: int):
         """Reset consecutive error count"""
-        pool = await self.get_pool()
+        pool = self._pool
         async with pool.acquire() as conn:
             await conn.execute(
                 """
                 UPDATE token_stats SET consecutive_error_count = 0 WHERE token_id = $1
             """, token_id)
 
-    async def create_task(self, task: Task) -> int:
-        """Create a new task"""
-        pool = await self.get_pool()
+    async def create_task(self, task: Task, log_id: Optional[int] = None) -> int:
+        """Create a new task
+
+        When log_id is given, the request log is linked to the new task in the
+        same statement (replacing a separate update_request_log_task_id call).
+        """
+        pool = self._pool
         async with pool.acquire() as conn:
-            task_db_id = await conn.fetchval(
-                """
-                INSERT INTO tasks (task_id, token_id, model, prompt, status, progress)
-                VALUES ($1, $2, $3, $4, $5, $6)
-                RETURNING id
-            """, task.task_id, task.token_id, task.model, task.prompt,
-                task.status, task.progress)
+            if log_id is None:
+                task_db_id = await conn.fetchval(
+                    """
+                    INSERT INTO tasks (task_id, token_id, model, prompt, status, progress)
+                    VALUES ($1, $2, $3, $4, $5, $6)
+                    RETURNING id
+                """, task.task_id, task.token_id, task.model, task.prompt,
+                    task.status, task.progress)
+            else:
+                task_db_id = await conn.fetchval(
+                    """
+                    WITH new_task AS (
+                        INSERT INTO tasks (task_id, token_id, model, prompt, status, progress)
+                        VALUES ($1, $2, $3, $4, $5, $6)
+                        RETURNING id
+                    ), linked_log AS (
+                        UPDATE request_logs
+                        SET task_id = $1, updated_at = CURRENT_TIMESTAMP
+                        WHERE id = $7
+                    )
+                    SELECT id FROM new_task
+                """, task.task_id, task.token_id, task.model, task.prompt,
+                    task.status, task.progress, log_id)
             return task_db_id
 
     async def update_task(self,
@@ -1022,7 +1210,7 @@ class Database:
                           result_urls: Optional[str] = None,
                           error_message: Optional[str] = None):
         """Update task status"""
-        pool = await self.get_pool()
+        pool = self._pool
         async with pool.acquire() as conn:
             completed_at = datetime.now() if status in ["completed", "failed"
                                                         ] else None
@@ -1036,17 +1224,74 @@ class Database:
 
     async def get_task(self, task_id: str) -> Optional[Task]:
         """Get task by ID"""
-        pool = await self.get_pool()
+        pool = self._pool
         async with pool.acquire() as conn:
-            row = await conn.fetchrow("SELECT * FROM tasks WHERE task_id = $1",
-                                      task_id)
+            row = await conn.fetchrow(_SQL_GET_TASK, task_id)
             if row:
                 return Task(**self._row_to_dict(row))
             return None
 
+    async def start_log_writer(self):
+        """Start the background task that batches buffered request logs"""
+        if self._log_writer_task is None:
+            self._log_writer_task = asyncio.create_task(self._log_writer_loop())
+
+    async def stop_log_writer(self):
+        """Flush buffered request logs and stop the background writer"""
+        if self._log_writer_task:
+            await self._log_queue.put(None)  # Sentinel: flush what is queued, then exit
+            await self._log_writer_task
+            self._log_writer_task = None
+
+    async def _log_writer_loop(self):
+        """Drain queued request logs in batches of up to _LOG_BATCH_SIZE"""
+        stopping = False
+        while not stopping:
+            batch = []
+            item = await self._log_queue.get()
+            if item is None:
+                stopping = True
+            else:
+                batch.append(item)
+                # Give concurrent requests a moment to join this batch
+                await asyncio.sleep(_LOG_FLUSH_INTERVAL)
+                while len(batch) < _LOG_BATCH_SIZE and not self._log_queue.empty():
+                    item = self._log_queue.get_nowait()
+                    if item is None:
+                        stopping = True
+                        break
+                    batch.append(item)
+
+            if batch:
+                try:
+                    pool = self._pool
+                    async with pool.acquire() as conn:
+                        await conn.copy_records_to_table(
+                            "request_logs",
+                            records=batch,
+                            columns=_REQUEST_LOG_COLUMNS)
+                except Exception as e:
+                    print(f"Failed to write {len(batch)} buffered request logs: {e}")
+
+    async def log_request_buffered(self, log: RequestLog):
+        """Queue a request log for a batched COPY insert (no log ID is returned)
+
+        Falls back to a direct insert when the background writer is not running
+        or its queue is full. Use log_request when the caller needs the log ID.
+        """
+        if self._log_writer_task is not None:
+            try:
+                self._log_queue.put_nowait(
+                    (log.token_id, log.task_id, log.operation, log.request_body,
+                     log.response_body, log.status_code, log.duration))
+                return
+            except asyncio.QueueFull:
+                pass
+        await self.log_request(log)
+
     async def log_request(self, log: RequestLog) -> int:
         """Log a request and return log ID"""
-        pool = await self.get_pool()
+        pool = self._pool
         async with pool.acquire() as conn:
             log_id = await conn.fetchval(
                 """
@@ -1063,34 +1308,24 @@ class Database:
                                  status_code: Optional[int] = None,
                                  duration: Optional[float] = None):
         """Update request log with completion data"""
-        pool = await self.get_pool()
+        fields = {
+            "response_body": response_body,
+            "status_code": status_code,
+            "duration": duration,
+        }
+        columns = tuple(col for col, value in fields.items() if value is not None)
+        if not columns:
+            return
+
+        query = _build_update_sql("request_logs", columns,
+                                  "updated_at = CURRENT_TIMESTAMP")
+        pool = self._pool
         async with pool.acquire() as conn:
-            updates = []
-            params = []
-            param_idx = 1
-
-            if response_body is not None:
-                updates.append(f"response_body = ${param_idx}")
-                params.append(response_body)
-                param_idx += 1
-            if status_code is not None:
-                updates.append(f"status_code = ${param_idx}")
-                params.append(status_code)
-                param_idx += 1
-            if duration is not None:
-                updates.append(f"duration = ${param_idx}")
-                params.append(duration)
-                param_idx += 1
-
-            if updates:
-                updates.append("updated_at = CURRENT_TIMESTAMP")
-                params.append(log_id)
-                query = f"UPDATE request_logs SET {', '.join(updates)} WHERE id = ${param_idx}"
-                await conn.execute(query, *params)
+            await conn.execute(query, *(fields[col] for col in columns), log_id)
 
     async def update_request_log_task_id(self, log_id: int, task_id: str):
         """Update request log with task_id"""
-        pool = await self.get_pool()
+        pool = self._pool
         async with pool.acquire() as conn:
             await conn.execute(
                 """
@@ -1100,41 +1335,98 @@ class Database:
             """, task_id, log_id)
 
     async def get_recent_logs(self, limit: int = 100) -> List[dict]:
-        """Get recent logs with token email"""
-        pool = await self.get_pool()
+        """Get recent logs with token email and task progress/status"""
+        pool = self._pool
         async with pool.acquire() as conn:
-            rows = await conn.fetch(
-                """
-                SELECT
-                    rl.id,
-                    rl.token_id,
-                    rl.task_id,
-                    rl.operation,
-                    rl.request_body,
-                    rl.response_body,
-                    rl.status_code,
-                    rl.duration,
-                    rl.created_at,
-                    t.email as token_email,
-                    t.username as token_username
-                FROM request_logs rl
-                LEFT JOIN tokens t ON rl.token_id = t.id
-                ORDER BY rl.created_at DESC
-                LIMIT $1
-            """, limit)
+            rows = await conn.fetch(_SQL_GET_RECENT_LOGS, limit)
             return [self._row_to_dict(row) for row in rows]
 
     async def clear_all_logs(self):
         """Clear all request logs"""
-        pool = await self.get_pool()
+        pool = self._pool
         async with pool.acquire() as conn:
             await conn.execute("DELETE FROM request_logs")
 
+    def _fresh_cached_config(self, key: str):
+        """Return the cached config model for key if it is within its TTL, else None"""
+        entry = self._config_cache.get(key)
+        if entry and time.monotonic() - entry[0] < _CONFIG_CACHE_TTL:
+            return entry[1]
+        return None
+
+    async def _get_cached_config(self, key: str, loader):
+        """Return a cached config model, loading it through loader() when stale
+
+        Callers get a copy, since some of them modify the model before saving it.
+        """
+        config = self._fresh_cached_config(key)
+        if config is not None:
+            return config.model_copy()
+
+        lock = self._config_locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            config = self._fresh_cached_config(key)
+            if config is not None:
+                return config.model_copy()
+            config = await loader()
+            self._config_cache[key] = (time.monotonic(), config)
+            return config.model_copy()
+
+    async def _publish_config_change(self, key: str, config=None):
+        """Refresh or drop the local cache entry for key and tell other processes
+
+        config, when given, is the row just written and is cached directly.
+        """
+        if config is not None:
+            self._config_cache[key] = (time.monotonic(), config)
+        else:
+            self._config_cache.pop(key, None)
+        try:
+            pool = self._pool
+            await pool.execute("SELECT pg_notify($1, $2)", _CONFIG_CHANNEL,
+                               f"{self._instance_id}:{key}")
+        except Exception as e:
+            print(f"Failed to publish {key} config change: {e}")
+
+    def _on_config_changed(self, connection, pid, channel, payload):
+        """LISTEN callback: drop the cache entry another process just changed"""
+        sender, _, key = payload.partition(":")
+        if sender != self._instance_id:
+            self._config_cache.pop(key, None)
+
+    async def start_config_listener(self):
+        """Listen for config changes made by other processes
+
+        Uses a dedicated connection outside the pool, since LISTEN is session
+        state. Without it, other processes' writes still show up once the
+        cache TTL expires.
+        """
+        if self._config_listener is not None:
+            return
+        if not self._listen_url:
+            print("Config change listener disabled (set DATABASE_DIRECT_URL behind PgBouncer)")
+            return
+        try:
+            self._config_listener = await asyncpg.connect(self._listen_url)
+            await self._config_listener.add_listener(_CONFIG_CHANNEL, self._on_config_changed)
+        except Exception as e:
+            print(f"Config change listener unavailable, relying on cache TTL: {e}")
+            if self._config_listener is not None:
+                await self._config_listener.close()
+            self._config_listener = None
+
+    async def stop_config_listener(self):
+        """Close the config change listener connection"""
+        if self._config_listener is not None:
+            await self._config_listener.close()
+            self._config_listener = None
+
+    @_cached_config("admin")
     async def get_admin_config(self) -> AdminConfig:
         """Get admin configuration"""
-        pool = await self.get_pool()
+        pool = self._pool
         async with pool.acquire() as conn:
-            row = await conn.fetchrow("SELECT * FROM admin_config WHERE id = 1")
+            row = await conn.fetchrow(_SQL_GET_ADMIN_CONFIG)
             if row:
                 return AdminConfig(**self._row_to_dict(row))
             return AdminConfig(admin_username="admin",
@@ -1143,7 +1435,7 @@ class Database:
 
     async def update_admin_config(self, config: AdminConfig):
         """Update admin configuration"""
-        pool = await self.get_pool()
+        pool = self._pool
         async with pool.acquire() as conn:
             await conn.execute(
                 """
@@ -1154,13 +1446,15 @@ class Database:
                 WHERE id = 1
             """, config.admin_username, config.admin_password, config.api_key, config.error_ban_threshold,
                 config.task_retry_enabled, config.task_max_retries, config.auto_disable_on_401)
+        await self._publish_config_change("admin")
 
     # Proxy config operations
+    @_cached_config("proxy")
     async def get_proxy_config(self) -> ProxyConfig:
         """Get proxy configuration"""
-        pool = await self.get_pool()
+        pool = self._pool
         async with pool.acquire() as conn:
-            row = await conn.fetchrow("SELECT * FROM proxy_config WHERE id = 1")
+            row = await conn.fetchrow(_SQL_GET_PROXY_CONFIG)
             if row:
                 return ProxyConfig(**self._row_to_dict(row))
             return ProxyConfig(proxy_enabled=False)
@@ -1168,7 +1462,7 @@ class Database:
     async def update_proxy_config(self, enabled: bool,
                                   proxy_url: Optional[str]):
         """Update proxy configuration"""
-        pool = await self.get_pool()
+        pool = self._pool
         async with pool.acquire() as conn:
             await conn.execute(
                 """
@@ -1176,13 +1470,14 @@ class Database:
                 SET proxy_enabled = $1, proxy_url = $2, updated_at = CURRENT_TIMESTAMP
                 WHERE id = 1
             """, enabled, proxy_url)
+        await self._publish_config_change("proxy")
 
+    @_cached_config("watermark_free")
     async def get_watermark_free_config(self) -> WatermarkFreeConfig:
         """Get watermark-free configuration"""
-        pool = await self.get_pool()
+        pool = self._pool
         async with pool.acquire() as conn:
-            row = await conn.fetchrow(
-                "SELECT * FROM watermark_free_config WHERE id = 1")
+            row = await conn.fetchrow(_SQL_GET_WATERMARK_FREE_CONFIG)
             if row:
                 return WatermarkFreeConfig(**self._row_to_dict(row))
             return WatermarkFreeConfig(watermark_free_enabled=False,
@@ -1192,7 +1487,7 @@ class Database:
                                           custom_parse_url: str = None, custom_parse_token: str = None,
                                           fallback_on_failure: bool = None):
         """Update watermark-free configuration"""
-        pool = await self.get_pool()
+        pool = self._pool
         async with pool.acquire() as conn:
             if parse_method is None and custom_parse_url is None and custom_parse_token is None and fallback_on_failure is None:
                 # Only update enabled status
@@ -1210,12 +1505,14 @@ class Database:
                     WHERE id = 1
                 """, enabled, parse_method or "third_party", custom_parse_url, custom_parse_token,
                     fallback_on_failure if fallback_on_failure is not None else True)
+        await self._publish_config_change("watermark_free")
 
+    @_cached_config("cache")
     async def get_cache_config(self) -> CacheConfig:
         """Get cache configuration"""
-        pool = await self.get_pool()
+        pool = self._pool
         async with pool.acquire() as conn:
-            row = await conn.fetchrow("SELECT * FROM cache_config WHERE id = 1")
+            row = await conn.fetchrow(_SQL_GET_CACHE_CONFIG)
             if row:
                 return CacheConfig(**self._row_to_dict(row))
             return CacheConfig(cache_enabled=False, cache_timeout=600)
@@ -1224,39 +1521,33 @@ class Database:
                                   enabled: bool = None,
                                   timeout: int = None,
                                   base_url: Optional[str] = None):
-        """Update cache configuration"""
-        pool = await self.get_pool()
-        async with pool.acquire() as conn:
-            row = await conn.fetchrow("SELECT * FROM cache_config WHERE id = 1")
-
-            if row:
-                current = self._row_to_dict(row)
-                new_enabled = enabled if enabled is not None else current.get(
-                    "cache_enabled", False)
-                new_timeout = timeout if timeout is not None else current.get(
-                    "cache_timeout", 600)
-                new_base_url = base_url if base_url is not None else current.get(
-                    "cache_base_url")
-            else:
-                new_enabled = enabled if enabled is not None else False
-                new_timeout = timeout if timeout is not None else 600
-                new_base_url = base_url
-
-            new_base_url = new_base_url if new_base_url else None
+        """Update cache configuration
 
+        Arguments left as None keep their stored value; an empty base_url
+        clears it.
+        """
+        pool = self._pool
+        async with pool.acquire() as conn:
             await conn.execute(
                 """
-                UPDATE cache_config
-                SET cache_enabled = $1, cache_timeout = $2, cache_base_url = $3, updated_at = CURRENT_TIMESTAMP
-                WHERE id = 1
-            """, new_enabled, new_timeout, new_base_url)
+                INSERT INTO cache_config (id, cache_enabled, cache_timeout, cache_base_url, updated_at)
+                VALUES (1, COALESCE($1::boolean, FALSE), COALESCE($2::integer, 600),
+                        NULLIF($3::text, ''), CURRENT_TIMESTAMP)
+                ON CONFLICT (id) DO UPDATE SET
+                    cache_enabled = COALESCE($1::boolean, cache_config.cache_enabled),
+                    cache_timeout = COALESCE($2::integer, cache_config.cache_timeout),
+                    cache_base_url = CASE WHEN $3::text IS NULL THEN cache_config.cache_base_url
+                                          ELSE NULLIF($3::text, '') END,
+                    updated_at = CURRENT_TIMESTAMP
+            """, enabled, timeout, base_url)
+        await self._publish_config_change("cache")
 
+    @_cached_config("generation")
     async def get_generation_config(self) -> GenerationConfig:
         """Get generation configuration"""
-        pool = await self.get_pool()
+        pool = self._pool
         async with pool.acquire() as conn:
-            row = await conn.fetchrow(
-                "SELECT * FROM generation_config WHERE id = 1")
+            row = await conn.fetchrow(_SQL_GET_GENERATION_CONFIG)
             if row:
                 return GenerationConfig(**self._row_to_dict(row))
             return GenerationConfig(image_timeout=300, video_timeout=3000)
@@ -1264,42 +1555,36 @@ class Database:
     async def update_generation_config(self,
                                        image_timeout: int = None,
                                        video_timeout: int = None):
-        """Update generation configuration"""
-        pool = await self.get_pool()
-        async with pool.acquire() as conn:
-            row = await conn.fetchrow(
-                "SELECT * FROM generation_config WHERE id = 1")
-
-            if row:
-                current = self._row_to_dict(row)
-                new_image_timeout = image_timeout if image_timeout is not None else current.get(
-                    "image_timeout", 300)
-                new_video_timeout = video_timeout if video_timeout is not None else current.get(
-                    "video_timeout", 3000)
-            else:
-                new_image_timeout = image_timeout if image_timeout is not None else 300
-                new_video_timeout = video_timeout if video_timeout is not None else 3000
+        """Update generation configuration
 
+        Arguments left as None keep their stored value.
+        """
+        pool = self._pool
+        async with pool.acquire() as conn:
             await conn.execute(
                 """
-                UPDATE generation_config
-                SET image_timeout = $1, video_timeout = $2, updated_at = CURRENT_TIMESTAMP
-                WHERE id = 1
-            """, new_image_timeout, new_video_timeout)
+                INSERT INTO generation_config (id, image_timeout, video_timeout, updated_at)
+                VALUES (1, COALESCE($1::integer, 300), COALESCE($2::integer, 3000), CURRENT_TIMESTAMP)
+                ON CONFLICT (id) DO UPDATE SET
+                    image_timeout = COALESCE($1::integer, generation_config.image_timeout),
+                    video_timeout = COALESCE($2::integer, generation_config.video_timeout),
+                    updated_at = CURRENT_TIMESTAMP
+            """, image_timeout, video_timeout)
+        await self._publish_config_change("generation")
 
+    @_cached_config("token_refresh")
     async def get_token_refresh_config(self) -> TokenRefreshConfig:
         """Get token refresh configuration"""
-        pool = await self.get_pool()
+        pool = self._pool
         async with pool.acquire() as conn:
-            row = await conn.fetchrow(
-                "SELECT * FROM token_refresh_config WHERE id = 1")
+            row = await conn.fetchrow(_SQL_GET_TOKEN_REFRESH_CONFIG)
             if row:
                 return TokenRefreshConfig(**self._row_to_dict(row))
             return TokenRefreshConfig(at_auto_refresh_enabled=False)
 
     async def update_token_refresh_config(self, at_auto_refresh_enabled: bool):
         """Update token refresh configuration"""
-        pool = await self.get_pool()
+        pool = self._pool
         async with pool.acquire() as conn:
             await conn.execute(
                 """
@@ -1307,14 +1592,16 @@ class Database:
                 SET at_auto_refresh_enabled = $1, updated_at = CURRENT_TIMESTAMP
                 WHERE id = 1
             """, at_auto_refresh_enabled)
+        await self._publish_config_change("token_refresh")
 
     # Call logic config operations
+    @_cached_config("call_logic")
     async def get_call_logic_config(self) -> "CallLogicConfig":
         """Get call logic configuration"""
         from .models import CallLogicConfig
-        pool = await self.get_pool()
+        pool = self._pool
         async with pool.acquire() as conn:
-            row = await conn.fetchrow("SELECT * FROM call_logic_config WHERE id = 1")
+            row = await conn.fetchrow(_SQL_GET_CALL_LOGIC_CONFIG)
             if row:
                 row_dict = self._row_to_dict(row)
                 if not row_dict.get("call_mode"):
@@ -1326,47 +1613,61 @@ class Database:
         """Update call logic configuration"""
         normalized = "polling" if call_mode == "polling" else "default"
         polling_mode_enabled = normalized == "polling"
-        pool = await self.get_pool()
+        pool = self._pool
         async with pool.acquire() as conn:
-            # Check if row exists
-            count = await conn.fetchval("SELECT COUNT(*) FROM call_logic_config WHERE id = 1")
-            if count == 0:
-                await conn.execute("""
-                    INSERT INTO call_logic_config (id, call_mode, polling_mode_enabled, updated_at)
-                    VALUES (1, $1, $2, CURRENT_TIMESTAMP)
-                """, normalized, polling_mode_enabled)
-            else:
-                await conn.execute("""
-                    UPDATE call_logic_config
-                    SET call_mode = $1, polling_mode_enabled = $2, updated_at = CURRENT_TIMESTAMP
-                    WHERE id = 1
-                """, normalized, polling_mode_enabled)
+            await conn.execute("""
+                INSERT INTO call_logic_config (id, call_mode, polling_mode_enabled, updated_at)
+                VALUES (1, $1, $2, CURRENT_TIMESTAMP)
+                ON CONFLICT (id) DO UPDATE SET
+                    call_mode = EXCLUDED.call_mode,
+                    polling_mode_enabled = EXCLUDED.polling_mode_enabled,
+                    updated_at = CURRENT_TIMESTAMP
+            """, normalized, polling_mode_enabled)
+        await self._publish_config_change("call_logic")
 
     # POW proxy config operations
+    @_cached_config("pow_proxy")
     async def get_pow_proxy_config(self) -> "PowProxyConfig":
         """Get POW proxy configuration"""
         from .models import PowProxyConfig
-        pool = await self.get_pool()
-        async with pool.acquire() as conn:
-            row = await conn.fetchrow("SELECT * FROM pow_proxy_config WHERE id = 1")
-            if row:
-                return PowProxyConfig(**self._row_to_dict(row))
-            return PowProxyConfig(pow_proxy_enabled=False, pow_proxy_url=None)
+        row = await self._pool.fetchrow(_SQL_GET_POW_PROXY_CONFIG)
+        if row:
+            # The row's columns match the model's fields and types, so skip validation
+            return PowProxyConfig.model_construct(**row)
+        return PowProxyConfig(pow_proxy_enabled=False, pow_proxy_url=None)
 
     async def update_pow_proxy_config(self, pow_proxy_enabled: bool, pow_proxy_url: Optional[str] = None):
-        """Update POW proxy configuration"""
-        pool = await self.get_pool()
-        async with pool.acquire() as conn:
-            # Check if row exists
-            count = await conn.fetchval("SELECT COUNT(*) FROM pow_proxy_config WHERE id = 1")
-            if count == 0:
-                await conn.execute("""
-                    INSERT INTO pow_proxy_config (id, pow_proxy_enabled, pow_proxy_url, updated_at)
-                    VALUES (1, $1, $2, CURRENT_TIMESTAMP)
-                """, pow_proxy_enabled, pow_proxy_url)
-            else:
-                await conn.execute("""
-                    UPDATE pow_proxy_config
-                    SET pow_proxy_enabled = $1, pow_proxy_url = $2, updated_at = CURRENT_TIMESTAMP
-                    WHERE id = 1
-                """, pow_proxy_enabled, pow_proxy_url)
+        """Update POW proxy configuration
+
+        The stored row is written through to the config cache, so the next
+        get_pow_proxy_config is served without a query.
+        """
+        from .models import PowProxyConfig
+        row = await self._pool.fetchrow(_SQL_UPSERT_POW_PROXY_CONFIG,
+                                        pow_proxy_enabled, pow_proxy_url)
+        if row is None:
+            # The stored row already had these values and was left untouched;
+            # only our own cache entry can be out of date
+            self._config_cache.pop("pow_proxy", None)
+            return
+        await self._publish_config_change("pow_proxy", PowProxyConfig.model_construct(**row))
+
+    async def get_all_configs(self) -> Dict[str, Any]:
+        """Load every config row concurrently, keyed like the config cache
+
+        Each getter acquires its own pooled connection, so the reads overlap
+        instead of costing one round-trip each.
+        """
+        keys = ("admin", "proxy", "watermark_free", "cache", "generation",
+                "token_refresh", "call_logic", "pow_proxy")
+        configs = await asyncio.gather(
+            self.get_admin_config(),
+            self.get_proxy_config(),
+            self.get_watermark_free_config(),
+            self.get_cache_config(),
+            self.get_generation_config(),
+            self.get_token_refresh_config(),
+            self.get_call_logic_config(),
+            self.get_pow_proxy_config(),
+        )
+        return dict(zip(keys, configs))
@@ -115,6 +115,7 @@ async def startup_event():
         config_dict = config.get_raw_config()
         is_first_startup = not db.db_exists()
 
+        await db.connect()
         await db.init_db()
 
         if is_first_startup:
@@ -133,14 +134,17 @@ async def startup_event():
         print(f"ERROR: Database initialization failed: {e}")
         raise
 
+    # Load all configuration rows from database in one concurrent pass
+    configs = await db.get_all_configs()
+
     # Load admin credentials and API key from database
-    admin_config = await db.get_admin_config()
+    admin_config = configs["admin"]
     config.set_admin_username_from_db(admin_config.admin_username)
     config.set_admin_password_from_db(admin_config.admin_password)
     config.api_key = admin_config.api_key
 
     # Load cache configuration from database
-    cache_config = await db.get_cache_config()
+    cache_config = configs["cache"]
     config.set_cache_enabled(cache_config.cache_enabled)
     config.set_cache_timeout(cache_config.cache_timeout)
     config.set_cache_base_url(cache_config.cache_base_url or "")
@@ -149,17 +153,17 @@ async def startup_event():
     generation_handler.file_cache.set_timeout(cache_config.cache_timeout)
 
     # Load generation configuration from database
-    generation_config = await db.get_generation_config()
+    generation_config = configs["generation"]
     config.set_image_timeout(generation_config.image_timeout)
     config.set_video_timeout(generation_config.video_timeout)
 
     # Load token refresh configuration from database
-    token_refresh_config = await db.get_token_refresh_config()
+    token_refresh_config = configs["token_refresh"]
     config.set_at_auto_refresh_enabled(
         token_refresh_config.at_auto_refresh_enabled)
 
     # Load call logic configuration from database
-    call_logic_config = await db.get_call_logic_config()
+    call_logic_config = configs["call_logic"]
     config.set_call_logic_mode(call_logic_config.call_mode)
     print(f"✓ Call logic mode: {call_logic_config.call_mode}")
 
@@ -171,6 +175,15 @@ async def startup_event():
     # Start file cache cleanup task
     await generation_handler.file_cache.start_cleanup_task()
 
+    # Start buffered request log writer
+    await db.start_log_writer()
+
+    # Start write-behind token usage writer
+    await db.start_usage_writer()
+
+    # Listen for config changes made by other workers
+    await db.start_config_listener()
+
     # Start token refresh scheduler if enabled
     if token_refresh_config.at_auto_refresh_enabled:
         scheduler.add_job(
@@ -191,6 +204,9 @@ async def startup_event():
 async def shutdown_event():
     """Cleanup on shutdown"""
     await generation_handler.file_cache.stop_cleanup_task()
+    await db.stop_log_writer()
+    await db.stop_usage_writer()
+    await db.stop_config_listener()
     await db.close()
     print("Database connection pool closed")
     if scheduler.running:
@@ -626,11 +626,8 @@ class GenerationHandler:
                 status="processing",
                 progress=0.0
             )
-            await self.db.create_task(task)
-
-            # Update log entry with task_id now that we have it
-            if log_id:
-                await self.db.update_request_log_task_id(log_id, task_id)
+            # Save the task and link the log entry to it in one statement
+            await self.db.create_task(task, log_id=log_id)
 
             # Record usage
             await self.token_manager.record_usage(token_obj.id, is_video=is_video)
@@ -1491,8 +1488,13 @@ class GenerationHandler:
 
     async def _log_request(self, token_id: Optional[int], operation: str,
                           request_data: Dict[str, Any], response_data: Dict[str, Any],
-                          status_code: int, duration: float, task_id: Optional[str] = None) -> Optional[int]:
-        """Log request to database and return log ID"""
+                          status_code: int, duration: float, task_id: Optional[str] = None,
+                          buffered: bool = False) -> Optional[int]:
+        """Log request to database and return log ID
+
+        With buffered=True the log is queued for a batched insert and no log ID
+        is returned; use it for final log entries that are never updated.
+        """
         try:
             log = RequestLog(
                 token_id=token_id,
@@ -1503,6 +1505,9 @@ class GenerationHandler:
                 status_code=status_code,
                 duration=duration
             )
+            if buffered:
+                await self.db.log_request_buffered(log)
+                return None
             return await self.db.log_request(log)
         except Exception as e:
             # Don't fail the request if logging fails
@@ -1684,7 +1689,8 @@ class GenerationHandler:
                     "cameo_id": cameo_id
                 },
                 status_code=200,
-                duration=duration
+                duration=duration,
+                buffered=True
             )
 
             # Step 7: Return success message
@@ -1723,7 +1729,8 @@ class GenerationHandler:
                     "error": str(e)
                 },
                 status_code=429 if is_cf_or_429 else 500,
-                duration=duration
+                duration=duration,
+                buffered=True
             )
 
             # Record error (check if it's an overload error or CF/429 error)
@@ -1860,7 +1867,8 @@ class GenerationHandler:
                     "stage": "character_created"
                 },
                 status_code=200,
-                duration=character_creation_duration
+                duration=character_creation_duration,
+                buffered=True
             )
 
             # Step 6: Generate video with character
@@ -1930,7 +1938,8 @@ class GenerationHandler:
                     "error": str(e)
                 },
                 status_code=500,
-                duration=duration
+                duration=duration,
+                buffered=True
             )
 
             # Parse error to check for CF shield/429